@@ -0,0 +1,62 @@
+"""
+Read throughput of `ModuleAttributeAccessor` under contention,
+with the default `RLock` and with `SharedExclusiveLock`.
+
+Run from repository root:
+
+    python benchmarks/accessor_contention.py [reads_per_thread]
+"""
+import sys
+import time
+from pathlib import Path
+from threading import Barrier, Thread
+from types import ModuleType
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from module_hot_reload.locks import SharedExclusiveLock  # noqa: E402
+from module_hot_reload.module_wrappers import (  # noqa: E402
+    ModuleAttributeAccessor,
+    Storage,
+)
+
+
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def measure(lock_class, thread_count: int, reads_per_thread: int) -> float:
+    """Returns reads per second"""
+    Storage.lock_class = lock_class
+    module = ModuleType(f'bench_{lock_class.__name__}_{thread_count}')
+    module.TIMEOUT = 42
+    accessor = ModuleAttributeAccessor(module)
+    barrier = Barrier(thread_count + 1)
+
+    def reader():
+        barrier.wait()
+        for _ in range(reads_per_thread):
+            accessor.TIMEOUT
+
+    threads = [Thread(target=reader) for _ in range(thread_count)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return thread_count * reads_per_thread / elapsed
+
+
+def main(reads_per_thread: int = 20_000) -> None:
+    from threading import RLock
+
+    print(f'{"threads":>8} {"RLock reads/s":>16} {"SharedExclusiveLock reads/s":>28}')
+    for thread_count in THREAD_COUNTS:
+        rlock = measure(RLock, thread_count, reads_per_thread)
+        shared = measure(SharedExclusiveLock, thread_count, reads_per_thread)
+        print(f'{thread_count:>8} {rlock:>16,.0f} {shared:>28,.0f}')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
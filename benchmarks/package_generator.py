@@ -0,0 +1,71 @@
+"""
+Generates synthetic packages for benchmarks.
+
+A package of <depth> levels: every package contains <modules_per_package>
+plain modules and <fan_out> subpackages (the deepest ones contain modules only).
+Every package imports all its children, so attribute based discovery sees them.
+Every module body runs a loop of <body_cost> iterations and defines VALUE.
+"""
+import shutil
+from pathlib import Path
+from typing import List, NamedTuple
+
+
+class GeneratedPackage(NamedTuple):
+    name: str
+    root: Path  # directory the package is in, to be put into sys.path
+    module_count: int
+    leaf_modules: List[str]  # dotted names of plain modules
+
+
+def _module_source(body_cost: int) -> str:
+    return (
+        f'_ = 0\n'
+        f'for _i in range({body_cost}):\n'
+        f'    _ += _i\n'
+        f'VALUE = 0\n'
+    )
+
+
+def generate_package(
+    root: Path,
+    name: str,
+    depth: int = 2,
+    fan_out: int = 3,
+    modules_per_package: int = 3,
+    body_cost: int = 0,
+) -> GeneratedPackage:
+    root = Path(root)
+    shutil.rmtree(root / name, ignore_errors=True)
+    leaf_modules = list()
+    module_count = 0
+
+    def make(path: Path, dotted: str, level: int) -> None:
+        nonlocal module_count
+        path.mkdir(parents=True)
+        children = list()
+        for i in range(modules_per_package):
+            (path / f'm{i}.py').write_text(_module_source(body_cost))
+            children.append(f'm{i}')
+            leaf_modules.append(f'{dotted}.m{i}')
+            module_count += 1
+        if level < depth:
+            for i in range(fan_out):
+                make(path / f'p{i}', f'{dotted}.p{i}', level + 1)
+                children.append(f'p{i}')
+        imports = ''.join(f'from . import {c}\n' for c in children)
+        (path / '__init__.py').write_text(imports + _module_source(body_cost))
+        module_count += 1
+
+    make(root / name, name, 1)
+    return GeneratedPackage(name, root, module_count, leaf_modules)
+
+
+def shape_for(module_count: int, fan_out: int = 3, modules_per_package: int = 3) -> int:
+    """Smallest depth giving at least <module_count> modules"""
+    depth, packages, total = 1, 1, 1 + modules_per_package
+    while total < module_count:
+        depth += 1
+        packages *= fan_out
+        total += packages * (1 + modules_per_package)
+    return depth
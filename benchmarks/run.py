@@ -0,0 +1,207 @@
+"""
+Benchmark suite. Results are printed (or written to --output) as JSON.
+
+Run from repository root:
+
+    python benchmarks/run.py --sizes 10,100,1000 --output results.json
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from threading import RLock
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from accessor_contention import measure as measure_reads  # noqa: E402
+from package_generator import generate_package, shape_for  # noqa: E402
+
+from module_hot_reload import module_wrappers, reloaders  # noqa: E402
+from module_hot_reload.locks import SharedExclusiveLock  # noqa: E402
+
+
+T_result = Dict[str, Any]
+
+WRAPPERS = (
+    module_wrappers.NewModuleUnawareAllModulesRecursiveStandardModuleWrapper,
+    module_wrappers.NewModuleAwareAllModulesRecursiveStandardModuleWrapper,
+    module_wrappers.NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    module_wrappers.NewModuleAwareDirModulesRecursiveStandardModuleWrapper,
+)
+AUTOMATIC_RELOADERS = (
+    reloaders.NewModuleUnawareAllModulesRecursiveAutomaticReloader,
+    reloaders.NewModuleAwareAllModulesRecursiveAutomaticReloader,
+    reloaders.NewModuleUnawareDirModulesRecursiveAutomaticReloader,
+    reloaders.NewModuleAwareDirModulesRecursiveAutomaticReloader,
+)
+MANUAL_RELOADERS = (
+    reloaders.NewModuleUnawareAllModulesRecursiveManualReloader,
+    reloaders.NewModuleAwareAllModulesRecursiveManualReloader,
+    reloaders.NewModuleUnawareDirModulesRecursiveManualReloader,
+    reloaders.NewModuleAwareDirModulesRecursiveManualReloader,
+)
+
+
+class Workspace:
+    """Generates uniquely named packages, so wrapper singletons never interfere"""
+    def __init__(self, body_cost: int):
+        self.root = Path(tempfile.mkdtemp(prefix='mhr_bench_'))
+        self.body_cost = body_cost
+        self.counter = 0
+        sys.path.insert(0, str(self.root))
+
+    def new_package(self, size: int):
+        self.counter += 1
+        generated = generate_package(
+            self.root, f'bench_pkg_{self.counter}', shape_for(size),
+            body_cost=self.body_cost,
+        )
+        importlib.invalidate_caches()
+        return generated, importlib.import_module(generated.name)
+
+
+def bench_discovery(workspace: Workspace, size: int) -> List[T_result]:
+    results = list()
+    for wrapper_class in WRAPPERS:
+        generated, package = workspace.new_package(size)
+        start = time.perf_counter()
+        wrapper = wrapper_class(package)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'benchmark': 'discovery',
+            'wrapper': wrapper_class.__name__,
+            'modules': generated.module_count,
+            'included': len(wrapper.get_included_modules()),
+            'seconds': elapsed,
+        })
+    return results
+
+
+def bench_register(workspace: Workspace, size: int, registered: int = 20) -> List[T_result]:
+    """Registers <registered> packages of <size> modules with a single reloader"""
+    results = list()
+    for reloader_class in MANUAL_RELOADERS:
+        packages = [workspace.new_package(size) for _ in range(registered)]
+        reloader = reloader_class()
+        can_register = register = 0.0
+        for _, package in packages:
+            start = time.perf_counter()
+            reloader.can_register(package)
+            can_register += time.perf_counter() - start
+            start = time.perf_counter()
+            reloader.register(package)
+            register += time.perf_counter() - start
+        results.append({
+            'benchmark': 'register',
+            'reloader': reloader_class.__name__,
+            'modules': packages[0][0].module_count,
+            'registered': registered,
+            'can_register_seconds': can_register,
+            'register_seconds': register,
+        })
+    return results
+
+
+def bench_reload_latency(workspace: Workspace, size: int, repeats: int = 5) -> List[T_result]:
+    """Time from writing a leaf module to the new value being visible"""
+    results = list()
+    for reloader_class in AUTOMATIC_RELOADERS:
+        generated, package = workspace.new_package(size)
+        leaf_name = generated.leaf_modules[-1]
+        leaf_path = generated.root.joinpath(*leaf_name.split('.')).with_suffix('.py')
+        leaf = sys.modules[leaf_name]
+
+        reloader = reloader_class(coalescing_window=0)
+        reloader.register(package)
+        reloader.set_daemon(True)
+        reloader.start()
+        time.sleep(0.2)  # let the observer settle
+
+        latencies = list()
+        for value in range(1, repeats + 1):
+            source = leaf_path.read_text().replace(f'VALUE = {value - 1}', f'VALUE = {value}')
+            start = time.perf_counter()
+            leaf_path.write_text(source)
+            while module_wrappers.ModuleAttributeAccessor(leaf).VALUE != value:
+                if time.perf_counter() - start > 30:
+                    break
+                time.sleep(0.001)
+            latencies.append(time.perf_counter() - start)
+
+        reloader.stop()
+        reloader.join()
+        results.append({
+            'benchmark': 'reload_latency',
+            'reloader': reloader_class.__name__,
+            'modules': generated.module_count,
+            'latencies_seconds': latencies,
+            'min_seconds': min(latencies),
+            'median_seconds': sorted(latencies)[len(latencies) // 2],
+        })
+    return results
+
+
+def bench_accessor_reads(threads: List[int], reads_per_thread: int) -> List[T_result]:
+    results = list()
+    for lock_class in (RLock, SharedExclusiveLock):
+        for thread_count in threads:
+            results.append({
+                'benchmark': 'accessor_reads',
+                'lock': lock_class.__name__,
+                'threads': thread_count,
+                'reads_per_second': measure_reads(lock_class, thread_count, reads_per_thread),
+            })
+    module_wrappers.Storage.lock_class = RLock
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10,100,1000',
+                        help='comma separated approximate module counts')
+    parser.add_argument('--threads', default='1,2,4,8,16,32,64')
+    parser.add_argument('--reads-per-thread', type=int, default=20_000)
+    parser.add_argument('--body-cost', type=int, default=0,
+                        help='loop iterations in each generated module body')
+    parser.add_argument('--benchmarks', default='discovery,register,reload_latency,accessor_reads')
+    parser.add_argument('--output', help='file to write JSON to, stdout by default')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    benchmarks = args.benchmarks.split(',')
+    workspace = Workspace(args.body_cost)
+
+    results = list()
+    for size in sizes:
+        if 'discovery' in benchmarks:
+            results += bench_discovery(workspace, size)
+        if 'register' in benchmarks:
+            results += bench_register(workspace, size)
+        if 'reload_latency' in benchmarks:
+            results += bench_reload_latency(workspace, size)
+    if 'accessor_reads' in benchmarks:
+        threads = [int(t) for t in args.threads.split(',')]
+        results += bench_accessor_reads(threads, args.reads_per_thread)
+
+    report = {
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
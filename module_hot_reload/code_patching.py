@@ -0,0 +1,131 @@
+import ast
+from types import CodeType, FunctionType, ModuleType
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+T_def = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+T_owner_def = Tuple[Tuple[str, ...], T_def]
+
+
+class CodePatch(NamedTuple):
+    function: FunctionType
+    code: CodeType
+    doc: Optional[str]
+    update_doc: bool
+
+
+def _iter_defs(node: ast.AST, owner: Tuple[str, ...] = ()) -> Iterator[T_owner_def]:
+    """
+    Functions defined in module or class bodies (including nested classes
+    and compound statements), not functions defined inside functions
+    """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield owner, child
+        elif isinstance(child, ast.ClassDef):
+            yield from _iter_defs(child, owner + (child.name,))
+        elif isinstance(child, ast.stmt):
+            yield from _iter_defs(child, owner)
+
+
+def _get_first_line(node: T_def) -> int:
+    """Same as co_firstlineno of the function's code"""
+    return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+
+def _iter_code(code: CodeType) -> Iterator[CodeType]:
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield const
+            yield from _iter_code(const)
+
+
+def _iter_functions(obj: Any, _depth: int = 0) -> Iterator[FunctionType]:
+    """Functions <obj> is or wraps: methods, properties, functools.wraps"""
+    if obj is None or _depth > 8:
+        return
+    if isinstance(obj, FunctionType):
+        yield obj
+    elif isinstance(obj, (staticmethod, classmethod)):
+        yield from _iter_functions(obj.__func__, _depth + 1)
+    elif isinstance(obj, property):
+        for f in (obj.fget, obj.fset, obj.fdel):
+            yield from _iter_functions(f, _depth + 1)
+    wrapped = getattr(obj, '__wrapped__', None)
+    if wrapped is not None and not isinstance(obj, type):
+        yield from _iter_functions(wrapped, _depth + 1)
+
+
+def _find_function(
+    module: ModuleType, owner: Tuple[str, ...], name: str, first_line: int,
+) -> Optional[FunctionType]:
+    namespace = vars(module)
+    for class_name in owner:
+        cls = namespace.get(class_name)
+        if not isinstance(cls, type):
+            return None
+        namespace = vars(cls)
+    for f in _iter_functions(namespace.get(name)):
+        if f.__code__.co_name == name and f.__code__.co_firstlineno == first_line:
+            return f
+    return None
+
+
+def get_code_patches(
+    module: ModuleType, path: str, old_source: bytes, new_source: bytes,
+) -> Optional[List[CodePatch]]:
+    """
+    Patches turning <module> loaded from <old_source> into <new_source>.
+    None if anything but bodies of functions changed,
+    so that the module has to be executed again.
+    """
+    try:
+        old_tree = ast.parse(old_source)
+        new_tree = ast.parse(new_source)
+        new_code = compile(new_source, path, 'exec', dont_inherit=True)
+    except (SyntaxError, ValueError):
+        return None
+
+    old_defs = list(_iter_defs(old_tree))
+    new_defs = list(_iter_defs(new_tree))
+    if len(old_defs) != len(new_defs):
+        return None
+    changed = [ast.dump(o) != ast.dump(n) for (_, o), (_, n) in zip(old_defs, new_defs)]
+    docs = [
+        (ast.get_docstring(o, clean=False), ast.get_docstring(n, clean=False))
+        for (_, o), (_, n) in zip(old_defs, new_defs)
+    ]
+
+    # the rest of the module must be the same
+    for _, node in old_defs + new_defs:
+        node.body = [ast.Pass()]
+    if ast.dump(old_tree) != ast.dump(new_tree):
+        return None
+
+    codes = {(c.co_name, c.co_firstlineno): c for c in _iter_code(new_code)}
+    patches = list()
+    for (owner, old), (_, new), is_changed, (old_doc, new_doc) in zip(
+        old_defs, new_defs, changed, docs,
+    ):
+        old_first_line, new_first_line = _get_first_line(old), _get_first_line(new)
+        if not is_changed and old_first_line == new_first_line:
+            continue
+
+        function = _find_function(module, owner, old.name, old_first_line)
+        code = codes.get((new.name, new_first_line))
+        if function is None or code is None:
+            if is_changed:
+                return None
+            continue  # moved only, e.g. a function defined under a false condition
+        if code.co_freevars != function.__code__.co_freevars:
+            return None  # e.g. super() started or stopped being used
+
+        patches.append(CodePatch(function, code, new_doc, function.__doc__ == old_doc))
+    return patches
+
+
+def apply_code_patches(patches: List[CodePatch]) -> None:
+    for patch in patches:
+        patch.function.__code__ = patch.code
+        if patch.update_doc:
+            patch.function.__doc__ = patch.doc
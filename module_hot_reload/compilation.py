@@ -0,0 +1,92 @@
+import marshal
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from types import CodeType, ModuleType
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+T_stat_key = Tuple[int, int]
+
+
+class CompiledSource(NamedTuple):
+    stat_key: T_stat_key
+    code: CodeType
+
+
+T_str_cs = Dict[str, CompiledSource]
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = Lock()
+
+
+def get_stat_key(path: str) -> Optional[T_stat_key]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _compile_to_bytes(source: bytes, path: str) -> bytes:
+    return marshal.dumps(compile(source, path, 'exec', dont_inherit=True))
+
+
+def _get_process_pool(processes: int) -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(processes)
+        return _process_pool
+
+
+def compile_sources(paths: Iterable[str], processes: int = 0) -> T_str_cs:
+    """
+    Reads and compiles .py files at <paths>.
+    Files that cannot be read or compiled are left out,
+    so that reloading them reports the error as usual.
+    With <processes> > 0 compilation happens in a process pool.
+    """
+    sources = dict()
+    for path in paths:
+        if not path.endswith('.py'):
+            continue
+        stat_key = get_stat_key(path)
+        try:
+            with open(path, 'rb') as f:
+                sources[path] = (stat_key, f.read())
+        except OSError:
+            continue
+
+    compiled = dict()
+    if processes > 0 and len(sources) > 1:
+        pool = _get_process_pool(processes)
+        futures = {
+            path: pool.submit(_compile_to_bytes, source, path)
+            for path, (_, source) in sources.items()
+        }
+        for path, future in futures.items():
+            try:
+                compiled[path] = CompiledSource(
+                    sources[path][0], marshal.loads(future.result())
+                )
+            except Exception:
+                continue
+    else:
+        for path, (stat_key, source) in sources.items():
+            try:
+                compiled[path] = CompiledSource(
+                    stat_key, compile(source, path, 'exec', dont_inherit=True)
+                )
+            except Exception:
+                continue
+    return compiled
+
+
+def exec_compiled(module: ModuleType, code: CodeType) -> None:
+    """Reloads <module> executing already compiled <code> in its namespace"""
+    name = module.__name__
+    if sys.modules.get(name) is not module:
+        raise ImportError(f'module {name} not in sys.modules', name=name)
+    exec(code, module.__dict__)
@@ -0,0 +1,202 @@
+import mmap
+import os
+import struct
+import tempfile
+from threading import Lock
+from time import monotonic, sleep
+from typing import Dict, Tuple
+
+
+T_str_i = Dict[str, int]
+
+_MAGIC = b'MHRGEN2\0'
+# magic, sequence, generation, epoch, slot count, flags
+_HEADER = struct.Struct('<8sQQQII')
+_SLOT = struct.Struct('<120sQ')  # module name, generation
+_SEQUENCE_OFFSET = 8
+_GENERATION_OFFSET = 16
+_FLAGS_OFFSET = 36
+
+_FLAG_REPLACED = 1
+
+
+def _open_mmap(path: str) -> mmap.mmap:
+    fd = os.open(path, os.O_RDWR)
+    try:
+        return mmap.mmap(fd, 0)
+    finally:
+        os.close(fd)
+
+
+class GenerationChannel:
+    """
+    Reload generations of modules shared by processes of a host through
+    a memory mapped file at <path> (e.g. in /dev/shm).
+    A single process publishes (see `CoordinatorReloaderMixin`), any number
+    of processes read (see `FollowerReloaderMixin`). Consistent reads are
+    guaranteed by a sequence lock: the writer makes the sequence odd while
+    it changes the table, readers retry when the sequence was odd or changed,
+    for at most <read_timeout> seconds.
+
+    With <create> a new file holding up to <slots> modules with a new random
+    <epoch> replaces the file at <path>, which is marked as replaced, so that
+    readers of the old file (never truncated under them) switch to the new one.
+    """
+    read_timeout: float = 1.0
+
+    def __init__(self, path: str, create: bool = False, slots: int = 256):
+        self.path = path
+        self._lock = Lock()  # threads of this process
+        self._slots_by_name: T_str_i = dict()
+
+        if create:
+            self._mmap = self._create(path, slots)
+        else:
+            self._mmap = self._open(path)
+        self.epoch, self.slots = self._read_header()
+
+    @staticmethod
+    def _create(path: str, slots: int) -> mmap.mmap:
+        size = _HEADER.size + slots * _SLOT.size
+        epoch = int.from_bytes(os.urandom(8), 'little')
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            os.fchmod(fd, 0o600)
+            os.ftruncate(fd, size)
+            new_mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _HEADER.pack_into(new_mmap, 0, _MAGIC, 0, 0, epoch, slots, 0)
+
+        try:
+            old_mmap = _open_mmap(path)
+        except (OSError, ValueError):  # missing or empty
+            old_mmap = None
+        os.replace(temp_path, path)
+        if old_mmap is not None:
+            if len(old_mmap) >= _HEADER.size and old_mmap[:len(_MAGIC)] == _MAGIC:
+                struct.pack_into('<I', old_mmap, _FLAGS_OFFSET, _FLAG_REPLACED)
+            old_mmap.close()
+        return new_mmap
+
+    @staticmethod
+    def _open(path: str) -> mmap.mmap:
+        channel_mmap = _open_mmap(path)
+        if len(channel_mmap) < _HEADER.size or channel_mmap[:len(_MAGIC)] != _MAGIC:
+            channel_mmap.close()
+            raise ValueError(f'{path} is not a generation channel')
+        return channel_mmap
+
+    def _read_header(self) -> Tuple[int, int]:
+        _, _, _, epoch, slots, _ = _HEADER.unpack_from(self._mmap, 0)
+        return epoch, slots
+
+    def _reopen_if_replaced(self) -> None:
+        if not struct.unpack_from('<I', self._mmap, _FLAGS_OFFSET)[0] & _FLAG_REPLACED:
+            return
+        with self._lock:
+            if not struct.unpack_from('<I', self._mmap, _FLAGS_OFFSET)[0] & _FLAG_REPLACED:
+                return
+            old_mmap = self._mmap
+            self._mmap = self._open(self.path)
+            self.epoch, self.slots = self._read_header()
+            self._slots_by_name = dict()
+            old_mmap.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    # Writing #################################################################
+
+    def _set_sequence(self, value: int) -> None:
+        struct.pack_into('<Q', self._mmap, _SEQUENCE_OFFSET, value)
+
+    def _get_slot(self, name: str) -> int:
+        slot = self._slots_by_name.get(name)
+        if slot is not None:
+            return slot
+
+        encoded = name.encode()
+        if len(encoded) > 120:
+            raise ValueError(f'Module name {name} is too long for a generation channel')
+        _, generations = self.read()
+        # slots allocated before this instance opened the channel
+        for slot, existing in enumerate(generations):
+            self._slots_by_name.setdefault(existing, slot)
+        slot = self._slots_by_name.get(name)
+        if slot is not None:
+            return slot
+
+        slot = len(generations)
+        if slot >= self.slots:
+            raise RuntimeError(f'Generation channel {self.path} is full')
+        sequence = self.get_sequence()
+        self._set_sequence(sequence + 1)
+        _SLOT.pack_into(self._mmap, _HEADER.size + slot * _SLOT.size, encoded, 0)
+        self._set_sequence(sequence + 2)
+        self._slots_by_name[name] = slot
+        return slot
+
+    def reserve(self, name: str) -> None:
+        """Allocates a slot for module <name>, so that publish() cannot fail later"""
+        with self._lock:
+            self._get_slot(name)
+
+    def publish(self, name: str) -> int:
+        """Increments generation of module <name>, returns the new generation"""
+        with self._lock:
+            offset = _HEADER.size + self._get_slot(name) * _SLOT.size
+            _, generation = _SLOT.unpack_from(self._mmap, offset)
+            sequence = self.get_sequence()
+            self._set_sequence(sequence + 1)
+            _SLOT.pack_into(self._mmap, offset, name.encode(), generation + 1)
+            struct.pack_into(
+                '<Q', self._mmap, _GENERATION_OFFSET,
+                struct.unpack_from('<Q', self._mmap, _GENERATION_OFFSET)[0] + 1,
+            )
+            self._set_sequence(sequence + 2)
+            return generation + 1
+
+    # Reading #################################################################
+
+    def get_sequence(self) -> int:
+        return struct.unpack_from('<Q', self._mmap, _SEQUENCE_OFFSET)[0]
+
+    def get_generation(self) -> int:
+        """
+        Number of publications so far in the current <epoch>.
+        Cheap, meant for polling.
+        """
+        self._reopen_if_replaced()
+        return struct.unpack_from('<Q', self._mmap, _GENERATION_OFFSET)[0]
+
+    def read(self) -> Tuple[int, T_str_i]:
+        """
+        Consistent snapshot of the current <epoch>:
+        (number of publications, {module name: generation}).
+        Raises TimeoutError if the table stays locked for <read_timeout>
+        seconds, e.g. because its publisher died while writing.
+        """
+        deadline = monotonic() + self.read_timeout
+        while True:
+            self._reopen_if_replaced()
+            sequence = self.get_sequence()
+            if sequence % 2 == 0:
+                data = self._mmap[:]
+                if self.get_sequence() == sequence:
+                    break
+            if monotonic() > deadline:
+                raise TimeoutError(
+                    f'Generation channel {self.path} is locked, its publisher may have died'
+                )
+            sleep(0)
+
+        _, _, generation, _, slots, _ = _HEADER.unpack_from(data, 0)
+        generations = dict()
+        for slot in range(slots):
+            encoded, slot_generation = _SLOT.unpack_from(data, _HEADER.size + slot * _SLOT.size)
+            name = encoded.rstrip(b'\0')
+            if not name:
+                break
+            generations[name.decode()] = slot_generation
+        return generation, generations
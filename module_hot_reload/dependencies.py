@@ -0,0 +1,152 @@
+import ast
+import os
+import sys
+from importlib.util import resolve_name
+from types import ModuleType
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set, Tuple
+
+from .utils import get_module_file
+
+
+T_str_set = Dict[str, Set[str]]
+T_stat_key = Tuple[int, int]
+T_from_import = Tuple[str, str]  # module imported from, module.name
+T_parsed_imports = Tuple[FrozenSet[str], FrozenSet[T_from_import]]
+T_imports_cache = Dict[str, Tuple[T_stat_key, T_parsed_imports]]
+
+_imports_cache: T_imports_cache = dict()
+
+
+def _parse_imported_names(source: bytes, package: str) -> T_parsed_imports:
+    """Names of imported modules and (base, base.name) pairs of `from` imports"""
+    names = set()
+    from_imports = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                parts = alias.name.split('.')
+                names.update('.'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        elif isinstance(node, ast.ImportFrom):
+            try:
+                base = resolve_name('.' * node.level + (node.module or ''), package)
+            except (ImportError, ValueError):
+                continue
+            from_imports.update((base, f'{base}.{alias.name}') for alias in node.names)
+    return frozenset(names), frozenset(from_imports)
+
+
+def _resolve_from_imports(from_imports: Iterable[T_from_import]) -> Set[str]:
+    """
+    `from X import name` depends on submodule X.name if it is one, on X otherwise.
+    Not on X in the first case: the package imports its submodules, so every
+    `from . import sibling` would make the module depend on all of them.
+    """
+    return set(full if full in sys.modules else base for base, full in from_imports)
+
+
+def get_source_imports(module: ModuleType) -> FrozenSet[str]:
+    """
+    Names of modules imported in the source of <module>.
+    Relative imports are resolved. Parsing results are cached per file
+    until its size or mtime change.
+    """
+    path = get_module_file(module)
+    if path is None or not path.endswith('.py'):
+        return frozenset()
+    try:
+        stat = os.stat(path)
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        cached = _imports_cache.get(path)
+        if cached is not None and cached[0] == stat_key:
+            parsed = cached[1]
+        else:
+            with open(path, 'rb') as f:
+                source = f.read()
+            package = module.__package__ or module.__name__.rpartition('.')[0]
+            parsed = _parse_imported_names(source, package)
+            _imports_cache[path] = (stat_key, parsed)
+    except (OSError, SyntaxError, ValueError):
+        return frozenset()
+    names, from_imports = parsed
+    return names.union(_resolve_from_imports(from_imports))
+
+
+def get_attribute_imports(module: ModuleType) -> Set[str]:
+    """Names of modules whose objects are bound as <module>'s attributes"""
+    names = set()
+    for attribute in list(vars(module).values()):
+        if isinstance(attribute, ModuleType):
+            names.add(attribute.__name__)
+        else:
+            name = getattr(attribute, '__module__', None)
+            if isinstance(name, str):
+                names.add(name)
+    return names
+
+
+class DependencyGraph:
+    """
+    Import dependency graph of <modules>.
+    Built from import statements in modules' sources and from
+    module attributes; dependencies outside of <modules> are ignored.
+    """
+    def __init__(self, modules: Iterable[ModuleType]):
+        self.modules: Sequence[ModuleType] = tuple(modules)
+        self.order = {m.__name__: i for i, m in enumerate(self.modules)}
+        self.dependencies: T_str_set = dict()
+        self.dependents: T_str_set = {m.__name__: set() for m in self.modules}
+
+        for m in self.modules:
+            names = get_source_imports(m).union(get_attribute_imports(m))
+            dependencies = set(n for n in names if n in self.order)
+            dependencies.discard(m.__name__)
+            self.dependencies[m.__name__] = dependencies
+            for d in dependencies:
+                self.dependents[d].add(m.__name__)
+
+    def get_dependents(self, modules: Iterable[ModuleType]) -> Set[str]:
+        """<modules> and all modules depending on them, transitively"""
+        result = set()
+        stack = [m.__name__ for m in modules if m.__name__ in self.order]
+        while stack:
+            name = stack.pop()
+            if name not in result:
+                result.add(name)
+                stack.extend(self.dependents[name])
+        return result
+
+    def sort(self, names: Iterable[str]) -> List[ModuleType]:
+        """
+        Modules named <names> ordered so that dependencies come before
+        their dependents. Members of import cycles keep reversed discovery order.
+        """
+        names = set(names)
+        remaining = {
+            n: len(self.dependencies[n].intersection(names)) for n in names
+        }
+        result = []
+        while remaining:
+            ready = [n for n, count in remaining.items() if count == 0]
+            if not ready:  # cycle, not a module waiting for one
+                cycle = [n for n in remaining if self._is_in_cycle(n, remaining)]
+                ready = [max(cycle, key=self.order.__getitem__)]
+            for n in sorted(ready, key=self.order.__getitem__, reverse=True):
+                del remaining[n]
+                result.append(self.modules[self.order[n]])
+                for d in self.dependents[n]:
+                    if d in remaining:
+                        remaining[d] -= 1
+        return result
+
+    def _is_in_cycle(self, name: str, names: Iterable[str]) -> bool:
+        """Whether <name> depends on itself through <names>"""
+        stack = [d for d in self.dependencies[name] if d in names]
+        visited = set()
+        while stack:
+            d = stack.pop()
+            if d == name:
+                return True
+            if d not in visited:
+                visited.add(d)
+                stack.extend(n for n in self.dependencies[d] if n in names)
+        return False
@@ -0,0 +1,67 @@
+import gc
+import inspect
+import weakref
+from types import ModuleType
+from typing import Any, Iterable, List, NamedTuple, Tuple
+
+
+T_snapshot = List[Tuple[str, str, weakref.ref]]
+
+
+class SupersededObject(NamedTuple):
+    module: str
+    name: str
+    object: Any
+    referrers: int
+
+
+class SupersededObjectsTracker:
+    """
+    Finds functions and classes replaced by a reload which are still alive,
+    i.e. something still references a version from before the reload.
+    """
+    def __init__(self):
+        self._superseded: T_snapshot = list()
+
+    @staticmethod
+    def take_snapshot(modules: Iterable[ModuleType]) -> Tuple[T_snapshot, List[ModuleType]]:
+        """To be called right before reload of <modules>"""
+        modules = list(modules)
+        snapshot = list()
+        for m in modules:
+            for name, value in tuple(vars(m).items()):
+                if (
+                    (inspect.isfunction(value) or inspect.isclass(value))
+                    and getattr(value, '__module__', None) == m.__name__
+                ):
+                    try:
+                        snapshot.append((m.__name__, name, weakref.ref(value)))
+                    except TypeError:
+                        continue
+        return snapshot, modules
+
+    def collect(self, snapshot: Tuple[T_snapshot, List[ModuleType]]) -> None:
+        """To be called right after the reload"""
+        entries, modules = snapshot
+        namespaces = {m.__name__: vars(m) for m in modules}
+        for module_name, name, ref in entries:
+            old = ref()
+            if old is not None and namespaces[module_name].get(name) is not old:
+                self._superseded.append((module_name, name, ref))
+
+    def get_alive(self) -> List[SupersededObject]:
+        gc.collect()
+        self._superseded = [e for e in self._superseded if e[2]() is not None]
+        result = list()
+        for module_name, name, ref in self._superseded:
+            obj = ref()
+            if obj is not None:
+                result.append(
+                    SupersededObject(module_name, name, obj, len(gc.get_referrers(obj)))
+                )
+        return result
+
+    def report(self) -> str:
+        return '\n'.join(
+            f'{o.module}.{o.name}: {o.referrers} referrer(s)' for o in self.get_alive()
+        )
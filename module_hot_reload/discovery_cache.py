@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from types import ModuleType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence
+
+from .fingerprints import Fingerprint
+from .utils import get_file_dir, get_module_file
+
+
+T_str_fp = Dict[str, Fingerprint]
+
+_FORMAT_VERSION = 1
+
+
+def get_default_cache_directory() -> str:
+    return os.environ.get('MODULE_HOT_RELOAD_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache')),
+        'module_hot_reload',
+    )
+
+
+class CachedDiscovery(NamedTuple):
+    modules: List[ModuleType]
+    fingerprints: T_str_fp  # file -> fingerprint of the file as it was loaded
+    file_dirs: Dict[str, str]  # file -> resolved directory
+
+
+class DiscoveryCache:
+    """
+    On-disk cache of included modules, resolved directories and fingerprints
+    of their files, one file per wrapper kind, module root and Python version
+    in <directory>. An entry is only used if every file still has the recorded
+    size and mtime and every module is already imported, so validating it
+    costs a stat() per file instead of walking modules and hashing files.
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory or get_default_cache_directory()
+
+    def get_entry_path(self, kind: str, root: str) -> str:
+        key = '\0'.join((kind, root, sys.version, str(_FORMAT_VERSION)))
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def load(self, kind: str, root: str) -> Optional[CachedDiscovery]:
+        try:
+            with open(self.get_entry_path(kind, root)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('root') != root or entry.get('kind') != kind:
+            return None  # hash collision
+
+        modules = list()
+        fingerprints = dict()
+        file_dirs = dict()
+        for name, path, file_dir, size, mtime_ns, digest in entry['modules']:
+            module = sys.modules.get(name)
+            if module is None or get_module_file(module) != path:
+                return None
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                return None
+            modules.append(module)
+            fingerprints[path] = Fingerprint(
+                size, mtime_ns, bytes.fromhex(digest) if digest is not None else None
+            )
+            file_dirs[path] = file_dir
+        return CachedDiscovery(modules, fingerprints, file_dirs)
+
+    def save(
+        self,
+        kind: str,
+        root: str,
+        modules: Sequence[ModuleType],
+        fingerprints: Mapping[str, Optional[Fingerprint]],
+    ) -> None:
+        """<fingerprints> of files as loaded; modules without one are not cached"""
+        entries = list()
+        for m in modules:
+            path = get_module_file(m)
+            fingerprint = fingerprints.get(path) if path is not None else None
+            if fingerprint is None:
+                return  # cannot be validated later
+            digest = fingerprint.digest.hex() if fingerprint.digest is not None else None
+            entries.append((
+                m.__name__, path, get_file_dir(path),
+                fingerprint.size, fingerprint.mtime_ns, digest,
+            ))
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return  # the cache is an optimization only
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'kind': kind, 'root': root, 'modules': entries}, f)
+            os.replace(temp_path, self.get_entry_path(kind, root))
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,144 @@
+import traceback
+from itertools import count
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Set
+
+from .metrics import Metrics, metrics
+
+
+T_action = Callable[[], None]
+
+
+class ReloadJob(NamedTuple):
+    key: Hashable
+    callback: T_action
+    locks: FrozenSet[Any]
+    priority: int
+    sequence: int
+
+
+class ReloadExecutor:
+    """
+    Runs reload jobs on a pool of worker threads.
+
+    Jobs whose lock sets do not intersect run in parallel, intersecting ones
+    are serialized. A job submitted while another job with the same key
+    is still pending supersedes it. Jobs with higher priority run first,
+    jobs with equal priority run in submission order.
+    When <max_pending> jobs are pending, `submit()` blocks.
+    Failed jobs are printed and counted in <metrics>.
+    """
+    metrics: Metrics = metrics
+
+    def __init__(self, max_workers: int = 1, max_pending: int = 1024):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._condition = Condition()
+        self._sequence = count()
+        self._pending: Dict[Hashable, ReloadJob] = dict()
+        self._running_keys: Set[Hashable] = set()
+        self._running_locks: Set[Any] = set()
+        self._workers: List[Thread] = list()
+        self._shutdown = False
+        self.jobs_submitted = 0
+        self.jobs_superseded = 0
+        self.jobs_executed = 0
+        self.jobs_cancelled = 0
+        self.jobs_failed = 0
+
+    def submit(
+        self,
+        key: Hashable,
+        callback: T_action,
+        locks: Iterable[Any] = (),
+        priority: int = 0,
+    ) -> bool:
+        """Returns True if a pending job with the same key was superseded"""
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit a job after shutdown')
+
+            superseded = key in self._pending
+            if superseded:
+                self.jobs_superseded += 1
+            else:
+                self._condition.wait_for(lambda: len(self._pending) < self.max_pending)
+
+            self._pending[key] = ReloadJob(
+                key, callback, frozenset(locks), priority, next(self._sequence)
+            )
+            self.jobs_submitted += 1
+
+            if len(self._workers) < self.max_workers:
+                worker = Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._condition.notify_all()
+        return superseded
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Drops the pending job with <key>, returns True if there was one.
+        A job that is already running is not affected.
+        """
+        with self._condition:
+            if self._pending.pop(key, None) is None:
+                return False
+            self.jobs_cancelled += 1
+            self._condition.notify_all()  # room in the queue for blocked submitters
+        return True
+
+    def _take_next_job(self) -> Optional[ReloadJob]:
+        runnable = [
+            job for job in self._pending.values()
+            if job.key not in self._running_keys
+            and self._running_locks.isdisjoint(job.locks)
+        ]
+        if not runnable:
+            return None
+        job = min(runnable, key=lambda j: (-j.priority, j.sequence))
+        del self._pending[job.key]
+        self._running_keys.add(job.key)
+        self._running_locks.update(job.locks)
+        self._condition.notify_all()  # room in the queue for blocked submitters
+        return job
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._take_next_job()
+                while job is None:
+                    if self._shutdown and not self._pending:
+                        return
+                    self._condition.wait()
+                    job = self._take_next_job()
+
+            try:
+                job.callback()
+            except Exception as e:
+                traceback.print_exc()
+                with self._condition:
+                    self.jobs_failed += 1
+                self.metrics.increment(
+                    'reload_jobs_failed_total',
+                    job=getattr(job.key, '__name__', str(job.key)),
+                    exception=type(e).__name__,
+                )
+            finally:
+                with self._condition:
+                    self._running_keys.discard(job.key)
+                    self._running_locks.difference_update(job.locks)
+                    self.jobs_executed += 1
+                    self._condition.notify_all()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Pending jobs are still executed"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            self.join()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for worker in tuple(self._workers):
+            worker.join(timeout)
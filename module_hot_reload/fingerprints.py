@@ -0,0 +1,71 @@
+import hashlib
+import os
+from typing import Dict, NamedTuple, Optional
+
+
+class Fingerprint(NamedTuple):
+    size: int
+    mtime_ns: int
+    digest: Optional[bytes] = None
+
+
+T_str_fp = Dict[str, Fingerprint]
+
+
+def take_fingerprint(path: str, hash_content: bool = True) -> Optional[Fingerprint]:
+    try:
+        stat = os.stat(path)
+        digest = None
+        if hash_content:
+            with open(path, 'rb') as f:
+                digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+    except OSError:
+        return None
+    return Fingerprint(stat.st_size, stat.st_mtime_ns, digest)
+
+
+class FingerprintTable:
+    """
+    Keeps fingerprints of files as they were when last loaded.
+    A file is considered changed if its size or mtime differ from recorded ones
+    and (when <hash_content> is on) its content hash differs as well,
+    so `touch` or rewriting identical content does not count as a change.
+    """
+    def __init__(self, hash_content: bool = True):
+        self.hash_content = hash_content
+        self.fingerprints: T_str_fp = dict()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.fingerprints
+
+    def get(self, path: str) -> Optional[Fingerprint]:
+        return self.fingerprints.get(path)
+
+    def record(self, path: str) -> None:
+        fingerprint = take_fingerprint(path, self.hash_content)
+        if fingerprint is None:
+            self.fingerprints.pop(path, None)
+        else:
+            self.fingerprints[path] = fingerprint
+
+    def forget(self, path: str) -> None:
+        self.fingerprints.pop(path, None)
+
+    def is_changed(self, path: str) -> bool:
+        old = self.fingerprints.get(path)
+        if old is None:
+            return True
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        if (stat.st_size, stat.st_mtime_ns) == (old.size, old.mtime_ns):
+            return False
+        if old.digest is None or stat.st_size != old.size:
+            return True
+
+        new = take_fingerprint(path, hash_content=True)
+        if new is None or new.digest != old.digest:
+            return True
+        self.fingerprints[path] = new  # same content, remember new mtime
+        return False
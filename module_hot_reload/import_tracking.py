@@ -0,0 +1,142 @@
+import os
+import sys
+from importlib.machinery import ModuleSpec
+from threading import Lock, local
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .utils import get_file_dir
+
+
+T_listener = Callable[[ModuleType], None]
+T_str_listeners = Dict[str, List[T_listener]]
+
+
+class DelegatingLoader:
+    """Delegates everything to <loader>; subclasses extend exec_module()"""
+    def __init__(self, loader: Any):
+        self.loader = loader
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.loader, name)
+
+    def create_module(self, spec: ModuleSpec) -> Optional[ModuleType]:
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module: ModuleType) -> None:
+        self.loader.exec_module(module)
+
+
+class DelegatingFinder:
+    """
+    `sys.meta_path` finder that finds nothing itself: it asks the rest of
+    `sys.meta_path` for the spec and replaces its loader with the result
+    of wrap_loader() (usually a DelegatingLoader), if any.
+    Imports with is_active() False are left alone.
+    """
+    def __init__(self):
+        self._local = local()
+
+    def is_active(self, fullname: str) -> bool:
+        return True
+
+    def wrap_loader(self, spec: ModuleSpec) -> Optional[Any]:
+        raise NotImplementedError('This is a base class. Override this method')
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None):
+        if getattr(self._local, 'busy', False) or not self.is_active(fullname):
+            return None
+
+        self._local.busy = True  # the rest of sys.meta_path may import too
+        try:
+            spec = None
+            for finder in tuple(sys.meta_path):
+                find_spec = getattr(finder, 'find_spec', None)
+                if finder is self or find_spec is None:
+                    continue
+                spec = find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._local.busy = False
+
+        if spec is not None and spec.loader is not None:
+            loader = self.wrap_loader(spec)
+            if loader is not None:
+                spec.loader = loader
+        return spec
+
+
+class _NotifyingLoader(DelegatingLoader):
+    """Calls listeners after the module is executed"""
+    def __init__(self, loader: Any, listeners: Sequence[T_listener]):
+        super().__init__(loader)
+        self.listeners = listeners
+
+    def exec_module(self, module: ModuleType) -> None:
+        self.loader.exec_module(module)
+        for listener in self.listeners:
+            listener(module)
+
+
+class ImportTracker(DelegatingFinder):
+    """
+    If an imported module is located in a tracked directory (or its
+    subdirectory), makes its loader notify the listeners once the module
+    is imported.
+    """
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+        self._listeners: T_str_listeners = dict()  # replaced as a whole on change
+
+    def install(self) -> None:
+        with self._lock:
+            if self not in sys.meta_path:
+                sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        with self._lock:
+            if self in sys.meta_path:
+                sys.meta_path.remove(self)
+
+    def track(self, directory: str, listener: T_listener) -> None:
+        directory = str(directory).rstrip(os.sep)
+        with self._lock:
+            listeners = dict(self._listeners)
+            listeners[directory] = listeners.get(directory, []) + [listener]
+            self._listeners = listeners
+
+    def untrack(self, directory: str, listener: T_listener) -> None:
+        directory = str(directory).rstrip(os.sep)
+        with self._lock:
+            listeners = dict(self._listeners)
+            remaining = [l for l in listeners.get(directory, []) if l != listener]
+            if remaining:
+                listeners[directory] = remaining
+            else:
+                listeners.pop(directory, None)
+            self._listeners = listeners
+
+    def _get_listeners(self, file: str) -> List[T_listener]:
+        tracked = self._listeners
+        result = list()
+        directory = get_file_dir(file)
+        while True:
+            result.extend(tracked.get(directory, ()))
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return result
+            directory = parent
+
+    def is_active(self, fullname: str) -> bool:
+        return bool(self._listeners)
+
+    def wrap_loader(self, spec: ModuleSpec) -> Optional[Any]:
+        if not spec.has_location:
+            return None
+        listeners = self._get_listeners(spec.origin)
+        return _NotifyingLoader(spec.loader, listeners) if listeners else None
+
+
+import_tracker = ImportTracker()
@@ -0,0 +1,306 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import selectors
+import struct
+import sys
+from threading import Lock, Thread
+from time import sleep
+from typing import Any, Dict, List, Set, Tuple
+
+from .metrics import Metrics, metrics
+from .watchdog_handlers import (
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_DELETED,
+    EVENT_TYPE_MODIFIED,
+    EVENT_TYPE_MOVED,
+    FileSystemEvent,
+)
+
+
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+_libc = None
+
+
+def _get_libc() -> Any:
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = (ctypes.c_int,)
+        libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+        _libc = libc
+    return _libc
+
+
+def is_available() -> bool:
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        return hasattr(_get_libc(), 'inotify_init1')
+    except OSError:
+        return False
+
+
+def _check(result: int) -> int:
+    if result < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+    return result
+
+
+class InotifyWatch:
+    def __init__(self, handler: Any, path: str, recursive: bool):
+        self.handler = handler
+        self.path = path
+        self.recursive = recursive
+        self.wds: Set[int] = set()
+
+
+class InotifyObserver(Thread):
+    """
+    Minimal Linux observer with the part of watchdog's observer interface
+    WatchManager uses: schedule(), unschedule(), start(), stop(), join().
+    A single thread reads the inotify file descriptor; every read takes all
+    queued events at once (waiting <read_delay> seconds first lets a burst
+    accumulate) and identical events of a read are dispatched once.
+    Only events handlers of this package use are produced:
+    modified, created, deleted and moved.
+    Can also be used without the thread: wait for fileno() to become readable
+    (e.g. with `loop.add_reader()`), then call read(); close() when done.
+    When the kernel's event queue overflows, events are lost: a modified event
+    is then dispatched for every .py file of watched directories instead,
+    and the overflow is counted in <metrics>.
+    """
+    read_size: int = 64 * 1024
+    read_delay: float = 0.0
+    metrics: Metrics = metrics
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._lock = Lock()
+        self._fd = _check(_get_libc().inotify_init1(IN_NONBLOCK | IN_CLOEXEC))
+        self._wake_r, self._wake_w = os.pipe()
+        self._stopping = False
+        self._closed = False
+        self._wd_paths: Dict[int, str] = dict()
+        self._wd_watches: Dict[int, InotifyWatch] = dict()
+
+    # Watches #################################################################
+
+    def _add_wd(self, watch: InotifyWatch, path: str) -> None:
+        try:
+            wd = _check(_get_libc().inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK))
+        except OSError as e:
+            if e.errno in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # gone or not a directory, nothing to watch
+            raise
+        self._wd_paths[wd] = path
+        self._wd_watches[wd] = watch
+        watch.wds.add(wd)
+
+    def _add_tree(self, watch: InotifyWatch, path: str) -> None:
+        self._add_wd(watch, path)
+        if watch.recursive:
+            for root, dirs, _ in os.walk(path):
+                dirs[:] = [d for d in dirs if d != '__pycache__']
+                for d in dirs:
+                    self._add_wd(watch, os.path.join(root, d))
+
+    def _forget_wd(self, wd: int) -> None:
+        self._wd_paths.pop(wd, None)
+        watch = self._wd_watches.pop(wd, None)
+        if watch is not None:
+            watch.wds.discard(wd)
+
+    def _remove_tree(self, path: str) -> None:
+        """Stops watching directories moved out of watched trees"""
+        prefix = path + os.sep
+        for wd, p in tuple(self._wd_paths.items()):
+            if p == path or p.startswith(prefix):
+                self._forget_wd(wd)
+                _get_libc().inotify_rm_watch(self._fd, wd)
+
+    def schedule(self, handler: Any, path: str, recursive: bool = False) -> InotifyWatch:
+        watch = InotifyWatch(handler, os.path.normpath(path), recursive)
+        with self._lock:
+            self._add_tree(watch, watch.path)
+        return watch
+
+    def unschedule(self, watch: InotifyWatch) -> None:
+        with self._lock:
+            for wd in tuple(watch.wds):
+                self._forget_wd(wd)
+                _get_libc().inotify_rm_watch(self._fd, wd)
+
+    # Without thread ##########################################################
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read(self) -> None:
+        """Dispatches all queued events, returns immediately if there are none"""
+        self._dispatch(self._read_events())
+
+    def close(self) -> None:
+        self._close()
+
+    # Thread ##################################################################
+
+    def stop(self) -> None:
+        self._stopping = True
+        os.write(self._wake_w, b'\0')
+        if not self.is_alive():
+            self._close()
+
+    def _close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return  # the numbers may belong to other files by now
+            self._closed = True
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(self) -> None:
+        # not select.select(): it fails for descriptors >= FD_SETSIZE (1024)
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(self._fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while not self._stopping:
+                ready = selector.select()
+                if self._stopping:
+                    break
+                if any(key.fd == self._fd for key, _ in ready):
+                    if self.read_delay > 0:
+                        sleep(self.read_delay)
+                    self._dispatch(self._read_events())
+        finally:
+            selector.close()
+            self._close()
+
+    # Events ##################################################################
+
+    def _read_events(self) -> List[Tuple[int, int, int, bytes]]:
+        chunks = list()
+        while True:
+            try:
+                chunk = os.read(self._fd, self.read_size)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        data = b''.join(chunks)
+
+        events = list()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def _get_overflow_events(self) -> List[Tuple[int, FileSystemEvent]]:
+        """Modified events for all .py files of watched directories"""
+        events = list()
+        for wd, directory in self._wd_paths.items():
+            try:
+                with os.scandir(directory) as entries:
+                    names = [e.name for e in entries if e.name.endswith('.py')]
+            except OSError:
+                continue
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                events.append((wd, FileSystemEvent(EVENT_TYPE_MODIFIED, path, False)))
+        return events
+
+    def _dispatch(self, raw_events: List[Tuple[int, int, int, bytes]]) -> None:
+        events: Dict[Tuple[int, FileSystemEvent], None] = dict()  # ordered, unique
+        moved_from: Dict[int, Tuple[int, str, bool]] = dict()
+
+        with self._lock:
+            for wd, mask, cookie, name in raw_events:
+                if mask & IN_Q_OVERFLOW:
+                    self.metrics.increment('inotify_queue_overflows_total')
+                    for event in self._get_overflow_events():
+                        events[event] = None
+                    continue
+                directory = self._wd_paths.get(wd)
+                watch = self._wd_watches.get(wd)
+                if directory is None or watch is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    if mask & IN_IGNORED:
+                        self._forget_wd(wd)
+                    continue
+
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                is_directory = bool(mask & IN_ISDIR)
+                if mask & IN_MODIFY:
+                    event = FileSystemEvent(EVENT_TYPE_MODIFIED, path, is_directory)
+                elif mask & IN_CREATE:
+                    event = FileSystemEvent(EVENT_TYPE_CREATED, path, is_directory)
+                    if is_directory and watch.recursive:
+                        self._add_tree(watch, path)
+                elif mask & IN_DELETE:
+                    event = FileSystemEvent(EVENT_TYPE_DELETED, path, is_directory)
+                elif mask & IN_MOVED_FROM:
+                    moved_from[cookie] = (wd, path, is_directory)
+                    continue
+                elif mask & IN_MOVED_TO:
+                    if is_directory and watch.recursive:
+                        self._add_tree(watch, path)  # moved watches get new paths
+                    source = moved_from.pop(cookie, None)
+                    if source is None:
+                        event = FileSystemEvent(EVENT_TYPE_CREATED, path, is_directory)
+                    else:
+                        event = FileSystemEvent(
+                            EVENT_TYPE_MOVED, source[1], is_directory, path
+                        )
+                else:
+                    continue
+                events[(wd, event)] = None
+
+            # moved out of watched directories
+            for wd, path, is_directory in moved_from.values():
+                events[(wd, FileSystemEvent(EVENT_TYPE_DELETED, path, is_directory))] = None
+                if is_directory:
+                    self._remove_tree(path)
+
+            handlers = {
+                wd: self._wd_watches[wd].handler
+                for wd, _ in events if wd in self._wd_watches
+            }
+
+        for wd, event in events:
+            handler = handlers.get(wd)
+            if handler is not None:
+                handler.dispatch(event)
@@ -0,0 +1,126 @@
+from threading import Condition, Lock, get_ident
+from typing import Any, Dict, Optional
+
+
+class SharedExclusiveLock:
+    """
+    Readers-writer lock that can be used in place of `RLock`:
+    `with lock:`, `acquire()` and `release()` work with the exclusive side.
+    The shared side is used with `with lock.shared():`.
+
+    Both sides are reentrant, a thread holding the exclusive side may
+    take the shared side as well. Upgrading shared side to exclusive
+    is not supported. Waiting writers block new readers so writers
+    do not starve.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._owner: Optional[int] = None
+        self._owner_count = 0
+        self._readers: Dict[int, int] = dict()
+        self._writers_waiting = 0
+        self._shared_side = _SharedSide(self)
+
+    def _can_acquire(self) -> bool:
+        return self._owner is None and not self._readers
+
+    def _can_acquire_shared(self) -> bool:
+        return self._owner is None and not self._writers_waiting
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        me = get_ident()
+        with self._condition:
+            if self._owner == me:
+                self._owner_count += 1
+                return True
+            if me in self._readers:
+                raise RuntimeError('Cannot upgrade shared lock to exclusive')
+
+            if not self._can_acquire():
+                if not blocking:
+                    return False
+                self._writers_waiting += 1
+                try:
+                    acquired = self._condition.wait_for(
+                        self._can_acquire, None if timeout < 0 else timeout
+                    )
+                finally:
+                    self._writers_waiting -= 1
+                if not acquired:
+                    self._condition.notify_all()  # readers may be waiting for us
+                    return False
+
+            self._owner = me
+            self._owner_count = 1
+            return True
+
+    def release(self) -> None:
+        with self._condition:
+            if self._owner != get_ident():
+                raise RuntimeError('Cannot release un-acquired lock')
+            self._owner_count -= 1
+            if not self._owner_count:
+                self._owner = None
+                self._condition.notify_all()
+
+    def acquire_shared(self, blocking: bool = True, timeout: float = -1) -> bool:
+        me = get_ident()
+        with self._lock:
+            count = self._readers.get(me)
+            if count or self._owner == me:
+                self._readers[me] = (count or 0) + 1
+                return True
+
+            if self._owner is not None or self._writers_waiting:
+                if not blocking:
+                    return False
+                if not self._condition.wait_for(
+                    self._can_acquire_shared, None if timeout < 0 else timeout
+                ):
+                    return False
+
+            self._readers[me] = 1
+            return True
+
+    def release_shared(self) -> None:
+        me = get_ident()
+        with self._lock:
+            count = self._readers.get(me)
+            if count == 1:
+                del self._readers[me]
+                if not self._readers and self._writers_waiting:
+                    self._condition.notify_all()
+            elif count:
+                self._readers[me] = count - 1
+            else:
+                raise RuntimeError('Cannot release un-acquired lock')
+
+    def shared(self) -> '_SharedSide':
+        return self._shared_side
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+class _SharedSide:
+    __slots__ = ('lock',)
+
+    def __init__(self, lock: SharedExclusiveLock):
+        self.lock = lock
+
+    def __enter__(self) -> bool:
+        return self.lock.acquire_shared()
+
+    def __exit__(self, *args) -> None:
+        self.lock.release_shared()
+
+
+def shared_side(lock: Any) -> Any:
+    """Shared side of <lock> if it has one, <lock> itself otherwise"""
+    if isinstance(lock, SharedExclusiveLock):
+        return lock.shared()
+    return lock
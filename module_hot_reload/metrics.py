@@ -0,0 +1,146 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+T_labels = Tuple[Tuple[str, str], ...]
+T_key = Tuple[str, T_labels]
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class MetricsListener:
+    """Callback interface. Override methods for metric kinds you need"""
+
+    def on_increment(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        pass
+
+    def on_observe(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        pass
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.bucket_counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self) -> List[int]:
+        counts, total = list(), 0
+        for c in self.bucket_counts:
+            total += c
+            counts.append(total)
+        return counts
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: T_labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    """
+    Counters and histograms identified by name and labels.
+    Listeners are notified of every increment and observation.
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.enabled = True
+        self._lock = Lock()
+        self._counters: Dict[T_key, float] = dict()
+        self._histograms: Dict[T_key, Histogram] = dict()
+        self._listeners: List[MetricsListener] = list()
+
+    def add_listener(self, listener: MetricsListener) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: MetricsListener) -> None:
+        self._listeners.remove(listener)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for listener in tuple(self._listeners):
+            listener.on_increment(name, value, labels)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+        for listener in tuple(self._listeners):
+            listener.on_observe(name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Observes duration of the with-block in seconds"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def get_histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self, prefix: str = 'module_hot_reload_') -> str:
+        """Dump in Prometheus text exposition format"""
+        lines = list()
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            typed = set()
+            for (name, labels), value in counters:
+                full_name = prefix + name
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f'# TYPE {full_name} counter')
+                lines.append(f'{full_name}{_format_labels(labels)} {value}')
+
+            for (name, labels), histogram in histograms:
+                full_name = prefix + name
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f'# TYPE {full_name} histogram')
+                for bound, count in zip(histogram.buckets, histogram.cumulative_counts()):
+                    bucket_labels = labels + (('le', repr(float(bound))),)
+                    lines.append(f'{full_name}_bucket{_format_labels(bucket_labels)} {count}')
+                inf_labels = labels + (('le', '+Inf'),)
+                lines.append(f'{full_name}_bucket{_format_labels(inf_labels)} {histogram.count}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {histogram.sum}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
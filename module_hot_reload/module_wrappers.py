@@ -1,26 +1,68 @@
 import importlib
-from collections import defaultdict
+import linecache
+import os
+import sys
+import weakref
+from bisect import bisect_left
+from collections import deque
 from pathlib import Path
-from threading import RLock
-from types import ModuleType
-from typing import Any, Dict, Sequence, Set, Union
-
-from .utils import dirname, is_path_in_path, locked_method
-
-
-T_a_rl = Dict[Any, RLock]
+from threading import Lock, RLock
+from time import perf_counter
+from types import MappingProxyType, ModuleType
+from typing import (
+    Any, Callable, Deque, Dict, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple,
+    Union,
+)
+
+from .code_patching import apply_code_patches, get_code_patches
+from .compilation import compile_sources, exec_compiled, get_stat_key
+from .dependencies import DependencyGraph
+from .discovery_cache import DiscoveryCache
+from .diagnostics import SupersededObject, SupersededObjectsTracker
+from .fingerprints import FingerprintTable, take_fingerprint
+from .import_tracking import import_tracker
+from .locks import SharedExclusiveLock, shared_side
+from .metrics import Metrics, metrics
+from .profiling import ReloadProfile, import_timer, profile_module
+from .state import drop_state, get_state_key, restore_state, save_state
+from .utils import (
+    get_file_dir, get_module_file, is_subpath, locked_method, prime_file_dirs, sort_locks,
+)
+
+
+T_lock = Union[RLock, SharedExclusiveLock]
+T_a_rl = Dict[Any, T_lock]  # weak keys where possible
 T_mt_t_mwb = Dict[ModuleType, Dict[type, 'ModuleWrapperBase']]
-T_mt_aa = Dict[ModuleType, 'ModuleAttributeAccessor']
+T_mt_t_aa = Dict[ModuleType, Dict[type, 'ModuleAttributeAccessor']]
 T_mt_mwb_maa = Union[ModuleType, 'ModuleWrapperBase', 'ModuleAttributeAccessor']
 T_mwb_set = Set['ModuleWrapperBase']
+T_mt_mwb_set = Dict[ModuleType, T_mwb_set]
 
 
 class Storage:
-    _module_rlock_mapping: T_a_rl = defaultdict(RLock)
+    """
+    Keeps a lock per module. Modules are referenced weakly,
+    so a lock is dropped together with its module.
+    Set <lock_class> to `SharedExclusiveLock` before wrapping any module
+    to let readers (`ModuleAttributeAccessor`, `locked_get`) proceed in parallel.
+    """
+    lock_class: Callable[[], T_lock] = RLock
+    _module_rlock_mapping: T_a_rl = weakref.WeakKeyDictionary()
+    _strong_rlock_mapping: T_a_rl = dict()  # for objects not supporting weakrefs
+    _mapping_lock = Lock()
 
     @classmethod
-    def get_rlock(cls, obj: Any) -> RLock:
-        return cls._module_rlock_mapping[obj]
+    def get_rlock(cls, obj: Any) -> T_lock:
+        try:
+            mapping = cls._module_rlock_mapping
+            lock = mapping.get(obj)
+        except TypeError:
+            mapping = cls._strong_rlock_mapping
+            lock = mapping.get(obj)
+        if lock is None:
+            with cls._mapping_lock:
+                lock = mapping.setdefault(obj, cls.lock_class())
+        return lock
 
 
 def extract_module(module: T_mt_mwb_maa) -> ModuleType:
@@ -31,20 +73,78 @@ def extract_module(module: T_mt_mwb_maa) -> ModuleType:
         return object.__getattribute__(module, 'module')  
 
 
-def recursive_locked_module_iterator(module: ModuleType):
+def recursive_locked_module_iterator(
+    module: ModuleType,
+    _visited: Optional[Set[ModuleType]] = None,
+):
+    """
+    Yields <module> and, recursively, modules bound as its attributes
+    whose files are not higher in the file system than <module>'s one.
+    Each module is yielded once, so import cycles are fine.
+    A module's lock is held only while its attributes are read, never
+    together with another one's, so walks cannot deadlock against reloads
+    holding locks in the global order.
+    """
+    if _visited is None:
+        _visited = set()
+    _visited.add(module)
+
+    yield module
     with Storage.get_rlock(module):
-        yield module
-        for attribute_name in dir(module):
-            attribute = getattr(module, attribute_name)
-            if (
-                type(attribute) is ModuleType and
-                hasattr(attribute, '__file__') and
-                is_path_in_path(
-                    dirname(Path(module.__file__).resolve()),
-                    dirname(Path(attribute.__file__).resolve())
-                )
-            ):
-                yield from recursive_locked_module_iterator(attribute)
+        attributes = tuple(vars(module).values())
+    module_dir = get_file_dir(module.__file__)
+    for attribute in attributes:
+        if type(attribute) is not ModuleType or attribute in _visited:
+            continue
+        attribute_file = getattr(attribute, '__file__', None)
+        if attribute_file and is_subpath(get_file_dir(attribute_file), module_dir):
+            yield from recursive_locked_module_iterator(attribute, _visited)
+
+
+class LoadedModulesIndex:
+    """
+    Index of modules from `sys.modules` by resolved directories of their files.
+    Rebuilt lazily when loaded modules change. They are compared by id (not
+    by number, which misses a module replaced by another) and referenced
+    until the next rebuild, so that their ids are not reused meanwhile.
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._loaded: Tuple[Any, ...] = tuple()
+        self._ids: Tuple[int, ...] = tuple()
+        self._dirs: List[str] = list()
+        self._modules: List[ModuleType] = list()
+
+    def _rebuild(self, modules: Sequence[Any]) -> None:
+        entries: List[Tuple[str, ModuleType]] = list()
+        for m in modules:
+            file = getattr(m, '__file__', None)
+            if isinstance(m, ModuleType) and isinstance(file, str):
+                entries.append((get_file_dir(file) + os.sep, m))
+        entries.sort(key=lambda e: e[0])
+        self._dirs = [e[0] for e in entries]
+        self._modules = [e[1] for e in entries]
+
+    def get_modules_under(self, directory: str) -> List[ModuleType]:
+        """Loaded modules whose files are in <directory> or its subdirectories"""
+        prefix = str(Path(directory).resolve()).rstrip(os.sep) + os.sep
+        with self._lock:
+            modules = tuple(sys.modules.values())
+            ids = tuple(map(id, modules))
+            if ids != self._ids:
+                self._rebuild(modules)
+                self._loaded = modules
+                self._ids = ids
+
+            modules = list()
+            i = bisect_left(self._dirs, prefix)
+            while i < len(self._dirs) and self._dirs[i].startswith(prefix):
+                modules.append(self._modules[i])
+                i += 1
+            return modules
+
+
+loaded_modules_index = LoadedModulesIndex()
 
 
 class ModuleWrapperMeta(type):
@@ -53,47 +153,109 @@ class ModuleWrapperMeta(type):
     the module has been wrapped with.
     Basically singleton but there is an instance per wrapped module.
     """
-    _modules_classes_instances: T_mt_t_mwb = defaultdict(dict)
-    _all_instances: T_mwb_set = set()
+    _modules_classes_instances: T_mt_t_mwb = weakref.WeakKeyDictionary()
+    _all_instances: T_mwb_set = weakref.WeakSet()
+    _modules_including_instances: T_mt_mwb_set = weakref.WeakKeyDictionary()
+    _index_lock = Lock()
 
     def __call__(cls, module: T_mt_mwb_maa, *args, **kwargs) -> 'ModuleWrapperBase':
         module = extract_module(module)
 
-        classes = cls._modules_classes_instances[module]
+        classes = cls._modules_classes_instances.setdefault(module, dict())
         if cls not in classes:
             classes[cls] = new_instance = super().__call__(module, *args, **kwargs)
             cls._all_instances.add(new_instance)
-        instance = cls._modules_classes_instances[module][cls]
+        instance = classes[cls]
         instance.retrieved()
         return instance
 
+    @classmethod
+    def evict(cls, module: ModuleType) -> None:
+        """
+        Forgets all instances wrapping <module>.
+        Wrappers reference their modules, so without eviction
+        wrapped modules are never garbage collected.
+        """
+        for instance in cls._modules_classes_instances.pop(module, dict()).values():
+            cls._all_instances.discard(instance)
+            cls.update_included_index(instance, instance.included_modules, ())
+            instance.evicted()
+
+    @classmethod
+    def update_included_index(
+        cls,
+        instance: 'ModuleWrapperBase',
+        old_modules: Sequence[ModuleType],
+        new_modules: Sequence[ModuleType],
+    ) -> None:
+        """Keeps index of instances by modules they include up to date"""
+        old_modules = set(old_modules)
+        new_modules = set(new_modules)
+        with cls._index_lock:
+            for m in old_modules.difference(new_modules):
+                instances = cls._modules_including_instances.get(m)
+                if instances is not None:
+                    instances.discard(instance)
+                    if not instances:
+                        del cls._modules_including_instances[m]
+            for m in new_modules.difference(old_modules):
+                cls._modules_including_instances.setdefault(m, set()).add(instance)
+
+    @classmethod
+    def get_instances_including(cls, modules: Sequence[ModuleType]) -> T_mwb_set:
+        instances = set()
+        with cls._index_lock:
+            for m in modules:
+                instances.update(cls._modules_including_instances.get(m, ()))
+        return instances
+
     @classmethod
     def before_reload_included(cls, module: 'ModuleWrapperBase') -> None:
-        for instance in cls._all_instances:
-            if set(instance.get_included_modules()).intersection(
-                set(module.get_included_modules())
-            ):
-                instance.before_reload_included(module)
+        for instance in cls.get_instances_including(module.get_included_modules()):
+            instance.before_reload_included(module)
 
     @classmethod
     def after_reload_included(cls, module: 'ModuleWrapperBase') -> None:
-        for instance in cls._all_instances:
-            if set(instance.get_included_modules()).intersection(
-                set(module.get_included_modules())
-            ):
-                instance.after_reload_included(module)
+        for instance in cls.get_instances_including(module.get_included_modules()):
+            instance.after_reload_included(module)
+
+        ModuleAttributeAccessorMeta.after_reload_included(module)
 
 
 class ModuleWrapperBase(metaclass=ModuleWrapperMeta):
+    metrics: Metrics = metrics
+    # modules already reloaded by the ReloadBatch this instance is reloaded in
+    reloaded_in_batch: Optional[Set[ModuleType]] = None
+
     def __init__(self, module: ModuleType):
         self.lock = Storage.get_rlock(module)
+        self.reload_lock = RLock()
         self.module = module
         self.path = Path(module.__file__).resolve()
         self.is_dir = self.path.name == '__init__.py'
         self.is_file = not self.is_dir
-        self.included_modules: Sequence[ModuleType] = tuple()
+        # modules whose reload raised during the last do_reload()
+        self.failed_modules: Set[ModuleType] = set()
+        self._included_modules: Sequence[ModuleType] = tuple()
         self.update_included_modules()
 
+    @property
+    def included_modules(self) -> Sequence[ModuleType]:
+        return self._included_modules
+
+    @included_modules.setter
+    def included_modules(self, modules: Sequence[ModuleType]) -> None:
+        old_modules = self._included_modules
+        self._included_modules = modules
+        self.included_modules_changed(old_modules, modules)
+
+    def included_modules_changed(
+        self,
+        old_modules: Sequence[ModuleType],
+        new_modules: Sequence[ModuleType],
+    ) -> None:
+        ModuleWrapperMeta.update_included_index(self, old_modules, new_modules)
+
     @locked_method()
     def update_included_modules(self) -> None:
         raise NotImplementedError('This is a base class. Override this method')
@@ -110,25 +272,48 @@ class ModuleWrapperBase(metaclass=ModuleWrapperMeta):
     def locked_set(self, name: str, value: Any) -> None:
         setattr(self.module, name, value)
 
-    @locked_method()
+    @locked_method(shared=True)
     def locked_get(self, name: str) -> Any:
         return getattr(self.module, name)
 
-    @locked_method()
+    @locked_method('reload_lock')
     def reload(self) -> None:
+        self.prepare_reload()
+        self.locked_reload()
+
+    def prepare_reload(self) -> None:
+        """Called before reload with no lock of included modules taken.
+        Meant for expensive preparations readers should not wait for.
+        """
+
+    def locked_reload(self) -> None:
+        """
+        Locks of included modules (and this module's one) are acquired
+        in the global order (see sort_locks), so concurrent reloads
+        of overlapping wrappers cannot deadlock
+        """
         ModuleWrapperMeta.before_reload_included(self)
 
-        locks = self.get_included_locks()
+        locks = sort_locks(self.get_included_locks() | {self.lock})
 
+        acquired = list()
+        acquired_at = None
         try:
             for l in locks:
                 l.acquire()
+                acquired.append(l)
+            acquired_at = perf_counter()
 
             self.do_reload()
 
         finally:
-            for l in locks:
+            for l in reversed(acquired):
                 l.release()
+            if acquired_at is not None:
+                self.metrics.observe(
+                    'lock_held_seconds', perf_counter() - acquired_at,
+                    module=self.module.__name__,
+                )
 
         ModuleWrapperMeta.after_reload_included(self)
 
@@ -158,12 +343,21 @@ class ModuleWrapperBase(metaclass=ModuleWrapperMeta):
     def retrieved(self) -> None:
         pass
 
+    def evicted(self) -> None:
+        """Called when this instance is forgotten by ModuleWrapperMeta"""
+
 
 class AllModulesRecursiveUpdateMixin:
     @locked_method()
     def update_included_modules(self) -> None:
         self.included_modules = tuple(recursive_locked_module_iterator(self.module))
 
+    def get_included_directory(self) -> Optional[str]:
+        """Directory all modules loaded from belong to included modules.
+        None for single file modules: their directory is not their own tree.
+        """
+        return get_file_dir(str(self.path)) if self.is_dir else None
+
 
 class DirModulesRecursiveUpdateMixin:
     @locked_method()
@@ -173,28 +367,421 @@ class DirModulesRecursiveUpdateMixin:
         else:  # if self.is_file
             self.included_modules = tuple((self.module,))
 
+    def get_included_directory(self) -> Optional[str]:
+        """Directory all modules loaded from belong to included modules"""
+        return get_file_dir(str(self.path)) if self.is_dir else None
+
+
+class CachedDiscoveryMixin:
+    """
+    On first discovery takes included modules, resolved directories and
+    fingerprints of their files (used by FingerprintGatedDoReloadMixin)
+    from <discovery_cache> if its entry is still valid and covers every loaded
+    module from this module's directory, so that warm process starts skip
+    walking modules and hashing files. Otherwise modules are walked as usual
+    and the result is stored.
+    Must precede the class providing update_included_modules() in bases.
+    """
+    discovery_cache: DiscoveryCache = DiscoveryCache()
+
+    def get_discovery_key(self) -> Tuple[str, str]:
+        return f'{type(self).__module__}.{type(self).__qualname__}', str(self.path)
+
+    @locked_method()
+    def update_included_modules(self) -> None:
+        name = self.module.__name__
+        if not self.included_modules:
+            cached = self.discovery_cache.load(*self.get_discovery_key())
+            if cached is not None and not self.is_discovery_complete(cached.modules):
+                cached = None
+            if cached is not None:
+                prime_file_dirs(cached.file_dirs)
+                fingerprints = getattr(self, 'fingerprints', None)
+                if isinstance(fingerprints, FingerprintTable):
+                    for path, fingerprint in cached.fingerprints.items():
+                        if (fingerprint.digest is not None) == fingerprints.hash_content:
+                            fingerprints.fingerprints.setdefault(path, fingerprint)
+                self.included_modules = tuple(cached.modules)
+                self._cached_discovery = tuple(cached.modules)
+                self.metrics.increment('discovery_cache_hits_total', module=name)
+                return
+            self.metrics.increment('discovery_cache_misses_total', module=name)
+
+        super().update_included_modules()
+        if self.included_modules != getattr(self, '_cached_discovery', None):
+            self._cached_discovery = self.included_modules
+            self.save_discovery()
+
+    def is_discovery_complete(self, modules: Sequence[ModuleType]) -> bool:
+        """
+        False if a loaded submodule of this module is not among cached
+        <modules>, e.g. one imported depending on environment or config,
+        which a walk would include now.
+        Scans names of `sys.modules` only, resolving no paths.
+        """
+        cached = set(modules)
+        prefix = self.module.__name__ + '.'
+        return all(
+            m in cached
+            for name, m in tuple(sys.modules.items())
+            if name.startswith(prefix) and isinstance(m, ModuleType)
+        )
+
+    def save_discovery(self) -> None:
+        fingerprints = getattr(self, 'fingerprints', None)
+        if isinstance(fingerprints, FingerprintTable):
+            table = fingerprints.fingerprints
+        else:
+            table = dict()
+            for m in self.included_modules:
+                path = get_module_file(m)
+                if path is not None:
+                    table[path] = take_fingerprint(path, hash_content=False)
+        self.discovery_cache.save(*self.get_discovery_key(), self.included_modules, table)
+
 
 class StandardDoReloadMixin:
+    def get_reload_candidates(self) -> Sequence[ModuleType]:
+        """Modules next do_reload() is likely to reload.
+        Called without locks, so it must not rely on them.
+        """
+        return self.included_modules
+
+    @locked_method()
+    def get_modules_to_reload(self) -> Sequence[ModuleType]:
+        return self.get_included_modules()[::-1]
+
     @locked_method()
     def do_reload(self) -> None:
-        for m in self.get_included_modules()[::-1]:
+        modules = self.get_modules_to_reload()
+        skipped = len(self.get_included_modules()) - len(modules)
+        if skipped > 0:
+            self.metrics.increment(
+                'modules_skipped_total', skipped, module=self.module.__name__
+            )
+
+        if self.reloaded_in_batch is not None:
+            modules = [m for m in modules if m not in self.reloaded_in_batch]
+            self.reloaded_in_batch.update(modules)
+
+        self.failed_modules = set()
+        for m in modules:
+            start = perf_counter()
             try:
-                importlib.reload(m)
+                self.reload_module(m)
             except Exception as e:
+                self.failed_modules.add(m)
+                self.metrics.increment(
+                    'reload_failures_total',
+                    module=m.__name__, exception=type(e).__name__,
+                )
                 self.do_reload_except(e)
-        
+            finally:
+                self.metrics.observe(
+                    'module_reload_seconds', perf_counter() - start, module=m.__name__
+                )
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        importlib.reload(module)
+
     @locked_method()
     def do_reload_except(self, e: BaseException) -> None:
         pass
 
 
+class FingerprintGatedDoReloadMixin:
+    """
+    Keeps fingerprints (size, mtime, content hash) of included modules' files
+    and skips reloading of modules whose files did not change since last load.
+    Packages containing a changed module are reloaded too so that names they
+    import from it get rebound.
+    Must precede StandardDoReloadMixin (or a class using it) in bases.
+    """
+    hash_content: bool = True
+
+    def __init__(self, module: ModuleType):
+        self.fingerprints = FingerprintTable(self.hash_content)
+        super().__init__(module)
+
+    def included_modules_changed(
+        self,
+        old_modules: Sequence[ModuleType],
+        new_modules: Sequence[ModuleType],
+    ) -> None:
+        super().included_modules_changed(old_modules, new_modules)
+        for m in new_modules:
+            path = get_module_file(m)
+            if path is not None and path not in self.fingerprints:
+                self.fingerprints.record(path)
+
+    def get_reload_candidates(self) -> Sequence[ModuleType]:
+        return tuple(
+            m for m in super().get_reload_candidates()
+            if get_module_file(m) is not None
+            and self.fingerprints.is_changed(get_module_file(m))
+        )
+
+    @locked_method()
+    def get_changed_files(self) -> Set[str]:
+        changed = set()
+        for m in self.get_included_modules():
+            path = get_module_file(m)
+            if path is not None and self.fingerprints.is_changed(path):
+                changed.add(path)
+        return changed
+
+    @locked_method()
+    def get_modules_to_reload(self) -> Sequence[ModuleType]:
+        changed = self.get_changed_files()
+        if not changed:
+            return tuple()
+
+        changed_dirs = set(os.path.dirname(p) for p in changed)
+
+        def is_affected(m: ModuleType) -> bool:
+            path = get_module_file(m)
+            if path in changed:
+                return True
+            if hasattr(m, '__path__') and path is not None:
+                package_dir = os.path.dirname(path)
+                return any(is_subpath(d, package_dir) for d in changed_dirs)
+            return False
+
+        return tuple(filter(is_affected, super().get_modules_to_reload()))
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        path = get_module_file(module)
+        if path is not None:
+            self.fingerprints.record(path)
+        super().reload_module(module)
+
+
+class DependencyGraphDoReloadMixin(FingerprintGatedDoReloadMixin):
+    """
+    Reloads only modules whose files changed and modules depending on them
+    (transitively), in topological order: dependencies before dependents.
+    Must precede StandardDoReloadMixin (or a class using it) in bases.
+    """
+    @locked_method()
+    def get_modules_to_reload(self) -> Sequence[ModuleType]:
+        changed = self.get_changed_files()
+        if not changed:
+            return tuple()
+
+        included_modules = self.get_included_modules()
+        graph = DependencyGraph(included_modules)
+        changed_modules = [m for m in included_modules if get_module_file(m) in changed]
+        return tuple(graph.sort(graph.get_dependents(changed_modules)))
+
+
+class CodePatchingDoReloadMixin:
+    """
+    Reloads modules in which only bodies of functions and methods changed
+    by replacing `__code__` of the functions in place, without executing
+    module bodies again. Modules with any other change are reloaded as usual,
+    and so are all modules do_reload() reloads after them, so that names
+    they import get rebound. Modules whose source did not change are skipped.
+    Sources are remembered when modules get included and on every reload.
+    Must precede StandardDoReloadMixin (or a class using it) in bases,
+    after fingerprint and dependency mixins.
+    """
+    def __init__(self, module: ModuleType):
+        self.loaded_sources: Dict[str, bytes] = dict()
+        self._patching_allowed = True
+        super().__init__(module)
+
+    @staticmethod
+    def read_source(path: Optional[str]) -> Optional[bytes]:
+        if path is None or not path.endswith('.py'):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def included_modules_changed(
+        self,
+        old_modules: Sequence[ModuleType],
+        new_modules: Sequence[ModuleType],
+    ) -> None:
+        super().included_modules_changed(old_modules, new_modules)
+        for m in new_modules:
+            path = get_module_file(m)
+            if path not in self.loaded_sources:
+                source = self.read_source(path)
+                if source is not None:
+                    self.loaded_sources[path] = source
+
+    @locked_method()
+    def do_reload(self) -> None:
+        self._patching_allowed = True
+        super().do_reload()
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        path = get_module_file(module)
+        old_source = self.loaded_sources.get(path)
+        new_source = self.read_source(path)
+
+        if self._patching_allowed and None not in (old_source, new_source):
+            if new_source == old_source:
+                return
+            patches = get_code_patches(module, path, old_source, new_source)
+            if patches is not None:
+                apply_code_patches(patches)
+                self.loaded_sources[path] = new_source
+                linecache.checkcache(path)
+                self.metrics.increment('modules_patched_total', module=module.__name__)
+                return
+
+        self._patching_allowed = False
+        super().reload_module(module)
+        if new_source is not None:
+            self.loaded_sources[path] = new_source
+
+
+class StatePreservingDoReloadMixin:
+    """
+    Lets included modules keep expensive state across reloads:
+
+    `__reload_keep__` - names of globals to carry over. They stay in
+    the namespace while the module body is executed again (so the body
+    may skip rebuilding them: `if 'MODEL' not in globals(): ...`)
+    and are restored after that.
+
+    `__reload_save__()`, `__reload_restore__(state)` - hooks called before
+    and after the reload.
+
+    `__reload_key__()` - cheap key of the state (e.g. hash of a config file).
+    If it differs from the key taken on previous load, the state is dropped
+    and the module body builds it from scratch.
+
+    Must precede StandardDoReloadMixin (or a class using it) in bases.
+    """
+    def __init__(self, module: ModuleType):
+        self.state_keys: Dict[str, Any] = dict()
+        super().__init__(module)
+
+    def included_modules_changed(
+        self,
+        old_modules: Sequence[ModuleType],
+        new_modules: Sequence[ModuleType],
+    ) -> None:
+        super().included_modules_changed(old_modules, new_modules)
+        for m in new_modules:
+            if m.__name__ not in self.state_keys:
+                self.state_keys[m.__name__] = get_state_key(m)
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        state = save_state(module)
+        is_valid = get_state_key(module) == self.state_keys.get(module.__name__)
+        if not is_valid:
+            drop_state(module, state)
+
+        super().reload_module(module)
+
+        if is_valid:
+            restore_state(module, state)
+        self.state_keys[module.__name__] = get_state_key(module)
+
+
+class PrecompiledDoReloadMixin:
+    """
+    Two-phase reload: sources of reload candidates are read and compiled
+    before any lock of included modules is taken, only execution of compiled
+    code happens inside the critical section. Modules that were not compiled
+    in advance (or whose files changed since) are reloaded as usual.
+    With <compile_processes> > 0 compilation happens in a process pool.
+    Must directly precede StandardDoReloadMixin (or a class using it) in bases,
+    after other do-reload mixins.
+    """
+    compile_processes: int = 0
+
+    def __init__(self, module: ModuleType):
+        self.precompiled: Dict[str, Any] = dict()
+        super().__init__(module)
+
+    def prepare_reload(self) -> None:
+        super().prepare_reload()
+        paths = set(map(get_module_file, self.get_reload_candidates()))
+        paths.discard(None)
+        self.precompiled = compile_sources(paths, self.compile_processes)
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        path = get_module_file(module)
+        compiled = self.precompiled.pop(path, None)
+        if compiled is None or compiled.stat_key != get_stat_key(path):
+            super().reload_module(module)
+        else:
+            exec_compiled(module, compiled.code)
+
+    @locked_method()
+    def do_reload(self) -> None:
+        try:
+            super().do_reload()
+        finally:
+            self.precompiled = dict()
+
+
+class ProfilingDoReloadMixin:
+    """
+    Profiles every reload: wall and CPU time of every reloaded module
+    in the order do_reload() reloaded them, time of modules imported
+    for the first time during the reload and, with <profile_statements>,
+    time of top-level statements (uses `sys.settrace`, so it is slow and
+    does not combine with debuggers). The last profile is kept
+    in <last_profile> and passed to profile_finished().
+    Must precede other do-reload mixins in bases.
+    """
+    profile_statements: bool = False
+
+    def __init__(self, module: ModuleType):
+        self.last_profile: Optional[ReloadProfile] = None
+        self._profile: Optional[ReloadProfile] = None
+        super().__init__(module)
+
+    @locked_method()
+    def do_reload(self) -> None:
+        profile = self._profile = ReloadProfile(self.module.__name__)
+        import_timer.acquire()
+        start = perf_counter()
+        try:
+            super().do_reload()
+        finally:
+            profile.wall = perf_counter() - start
+            import_timer.release()
+            self._profile = None
+            self.last_profile = profile
+            self.profile_finished(profile)
+
+    @locked_method()
+    def reload_module(self, module: ModuleType) -> None:
+        reload_module = super().reload_module
+        if self._profile is None:
+            reload_module(module)
+        else:
+            profile_module(
+                self._profile, module, lambda: reload_module(module),
+                self.profile_statements,
+            )
+
+    def profile_finished(self, profile: ReloadProfile) -> None:
+        pass
+
+
 class NewModuleAwarenessMixin:
     def __init__(self, module: ModuleType):
         super().__init__(module)
         self._included_modules_obsolete = False
 
     @locked_method()
-    def before_reload_included(self, initiator: ModuleWrapperBase) -> None:
+    def after_reload_included(self, initiator: ModuleWrapperBase) -> None:
+        # modules imported during the reload, walked once on next access
         self._included_modules_obsolete = True
 
     @locked_method()
@@ -205,6 +792,126 @@ class NewModuleAwarenessMixin:
         return self.included_modules
 
 
+class ImportHookNewModuleAwarenessMixin:
+    """
+    Keeps track of modules added after instantiation with an import hook:
+    modules loaded from get_included_directory() are appended to included modules
+    as they get imported, even if they are never bound as attributes,
+    so the module tree is never rescanned.
+    Single file modules have no directory of their own; their attributes
+    are walked again after reloads, as NewModuleAwarenessMixin does.
+    `__main__` is never included.
+    Use instead of NewModuleAwarenessMixin, in front of a NewModuleUnaware wrapper.
+    """
+    def __init__(self, module: ModuleType):
+        self._imported_modules: Deque[ModuleType] = deque()
+        self._included_modules_obsolete = False
+        super().__init__(module)
+        directory = self.get_included_directory()
+        if directory is not None:
+            self._imported_modules.extend(
+                m for m in loaded_modules_index.get_modules_under(directory)
+                if m.__name__ != '__main__'
+            )
+            import_tracker.track(directory, self.module_imported)
+            import_tracker.install()
+
+    def evicted(self) -> None:
+        super().evicted()
+        directory = self.get_included_directory()
+        if directory is not None:
+            import_tracker.untrack(directory, self.module_imported)
+
+    def module_imported(self, module: ModuleType) -> None:
+        """Called by the import hook, possibly in another thread; takes no lock"""
+        if module.__name__ != '__main__':
+            self._imported_modules.append(module)
+
+    @locked_method()
+    def after_reload_included(self, initiator: ModuleWrapperBase) -> None:
+        super().after_reload_included(initiator)
+        if self.get_included_directory() is None:
+            self._included_modules_obsolete = True
+
+    @locked_method()
+    def get_included_modules(self) -> Sequence[ModuleType]:
+        if self._included_modules_obsolete:
+            self.update_included_modules()
+            self._included_modules_obsolete = False
+        if self._imported_modules:
+            included = set(self.included_modules)
+            new_modules = list()
+            while self._imported_modules:
+                m = self._imported_modules.popleft()
+                if m not in included:
+                    included.add(m)
+                    new_modules.append(m)
+            if new_modules:
+                self.included_modules = tuple(self.included_modules) + tuple(new_modules)
+        return self.included_modules
+
+
+class SupersededObjectsDiagnosticMixin:
+    """
+    Remembers functions and classes replaced by reloads, so that the ones
+    still referenced from somewhere (leaking old module versions)
+    can be reported with get_alive_superseded_objects().
+    """
+    def __init__(self, module: ModuleType):
+        self.superseded_objects = SupersededObjectsTracker()
+        super().__init__(module)
+
+    @locked_method()
+    def do_reload(self) -> None:
+        snapshot = self.superseded_objects.take_snapshot(self.get_included_modules())
+        try:
+            super().do_reload()
+        finally:
+            self.superseded_objects.collect(snapshot)
+
+    def get_alive_superseded_objects(self) -> List[SupersededObject]:
+        return self.superseded_objects.get_alive()
+
+
+class LazyReloadMixin:
+    """
+    Lazy reload policy: mark_stale() only remembers that the module
+    has to be reloaded, actual reload happens on first attribute access
+    through locked_get() or LazyModuleAttributeAccessor afterwards,
+    so all changes made in between are applied with a single reload.
+    """
+    _stale_instances: Dict[ModuleType, 'LazyReloadMixin'] = dict()
+
+    def __init__(self, module: ModuleType):
+        self._stale_action: Optional[Callable[[], None]] = None
+        super().__init__(module)
+
+    @property
+    def stale(self) -> bool:
+        return self._stale_action is not None
+
+    def mark_stale(self, action: Optional[Callable[[], None]] = None) -> None:
+        """<action> is what reload_if_stale() calls, reload() by default"""
+        self._stale_action = action or self.reload
+        LazyReloadMixin._stale_instances[self.module] = self
+
+    def reload_if_stale(self) -> None:
+        if self._stale_action is None:
+            return
+        with self.reload_lock:
+            action = self._stale_action
+            if action is None:
+                return
+            # changes made during the reload will mark the module stale again
+            self._stale_action = None
+            LazyReloadMixin._stale_instances.pop(self.module, None)
+            action()
+
+    def locked_get(self, name: str) -> Any:
+        self.reload_if_stale()
+        return super().locked_get(name)
+
+
 class NewModuleUnawareAllModulesRecursiveStandardModuleWrapper(
     AllModulesRecursiveUpdateMixin,
     StandardDoReloadMixin,
@@ -248,16 +955,33 @@ class NewModuleAwareDirModulesRecursiveStandardModuleWrapper(
 # Accessors ###################################################################
 
 class ModuleAttributeAccessorMeta(type):
-    _instances: T_mt_aa = dict()
+    _modules_classes_instances: T_mt_t_aa = weakref.WeakKeyDictionary()
 
     def __call__(cls, module: T_mt_mwb_maa) -> 'ModuleAttributeAccessor':
         module = extract_module(module)
-        instance = cls._instances.get(module)
+        classes = cls._modules_classes_instances.setdefault(module, dict())
+        instance = classes.get(cls)
         if not instance:
-            instance = super().__call__(module)
-            cls._instances[module] = instance
+            instance = classes[cls] = super().__call__(module)
         return instance
 
+    @classmethod
+    def evict(cls, module: ModuleType) -> None:
+        cls._modules_classes_instances.pop(module, None)
+
+    @classmethod
+    def after_reload_included(
+        cls,
+        module: 'ModuleWrapperBase',
+        modules: Optional[Sequence[ModuleType]] = None,
+    ) -> None:
+        """Notifies accessors of <modules>, included modules of <module> by default"""
+        if modules is None:
+            modules = module.get_included_modules()
+        for m in modules:
+            for instance in tuple(cls._modules_classes_instances.get(m, {}).values()):
+                type(instance).after_reload_included(instance, module)
+
 
 class ModuleAttributeAccessor(metaclass=ModuleAttributeAccessorMeta):
     """
@@ -274,12 +998,226 @@ class ModuleAttributeAccessor(metaclass=ModuleAttributeAccessorMeta):
     def __init__(self, module: T_mt_mwb_maa):
         module = extract_module(module)
         super().__setattr__('module', module)
-        super().__setattr__('lock', Storage.get_rlock(module))
+        lock = Storage.get_rlock(module)
+        super().__setattr__('lock', lock)
+        super().__setattr__('read_lock', shared_side(lock))
 
     def __getattribute__(self, name: str) -> Any:
-        with super().__getattribute__('lock'):
+        with super().__getattribute__('read_lock'):
             return getattr(super().__getattribute__('module'), name)
 
     def __setattr__(self, name: str, value: Any) -> None:
         with super().__getattribute__('lock'):
             setattr(super().__getattribute__('module'), name, value)
+
+    def after_reload_included(self, initiator: ModuleWrapperBase) -> None:
+        """Called after reload of any ModuleWrapperBase instance including this module.
+        Since attribute access is overridden, call it as
+        `type(accessor).after_reload_included(accessor, initiator)`
+        """
+
+
+class InstrumentedModuleAttributeAccessor(ModuleAttributeAccessor):
+    """Records time readers wait for the module lock as `accessor_lock_wait_seconds`"""
+    metrics: Metrics = metrics
+
+    def __getattribute__(self, name: str) -> Any:
+        module = object.__getattribute__(self, 'module')
+        start = perf_counter()
+        with object.__getattribute__(self, 'read_lock'):
+            waited = perf_counter() - start
+            try:
+                return getattr(module, name)
+            finally:
+                type(self).metrics.observe(
+                    'accessor_lock_wait_seconds', waited, module=module.__name__
+                )
+
+
+class LazyModuleAttributeAccessor(ModuleAttributeAccessor):
+    """Reloads the module first if it is wrapped with LazyReloadMixin and stale"""
+
+    def __getattribute__(self, name: str) -> Any:
+        stale_instances = LazyReloadMixin._stale_instances
+        if stale_instances:
+            instance = stale_instances.get(object.__getattribute__(self, 'module'))
+            if instance is not None:
+                instance.reload_if_stale()
+        return super().__getattribute__(name)
+
+
+class ModuleSnapshot(NamedTuple):
+    generation: int
+    namespace: Mapping[str, Any]
+
+
+class SnapshotModuleAttributeAccessor(ModuleAttributeAccessor):
+    """
+    Reads attributes from an immutable snapshot of module's namespace
+    without taking any lock. A new snapshot is published after each reload
+    including the module, so readers see either the old or the new module
+    as a whole, never a half-reloaded one. A reload that raised
+    in the module keeps the previous snapshot.
+
+    Attributes set through the accessor are published immediately;
+    attributes set on the module directly become visible after next reload
+    (until then they are read with the lock taken).
+    """
+
+    def __init__(self, module: T_mt_mwb_maa):
+        super().__init__(module)
+        object.__setattr__(self, 'snapshot', ModuleSnapshot(-1, MappingProxyType({})))
+        type(self).publish_snapshot(self)
+
+    def __getattribute__(self, name: str) -> Any:
+        try:
+            return object.__getattribute__(self, 'snapshot').namespace[name]
+        except KeyError:
+            return super().__getattribute__(name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        with object.__getattribute__(self, 'lock'):
+            super().__setattr__(name, value)
+            type(self).publish_snapshot(self)
+
+    def publish_snapshot(self) -> None:
+        with object.__getattribute__(self, 'lock'):
+            module = object.__getattribute__(self, 'module')
+            generation = object.__getattribute__(self, 'snapshot').generation + 1
+            namespace = MappingProxyType(dict(vars(module)))
+            object.__setattr__(self, 'snapshot', ModuleSnapshot(generation, namespace))
+
+    def after_reload_included(self, initiator: ModuleWrapperBase) -> None:
+        """Keeps the previous snapshot if the module's reload raised"""
+        module = object.__getattribute__(self, 'module')
+        if module not in getattr(initiator, 'failed_modules', ()):
+            type(self).publish_snapshot(self)
+
+
+def evict(module: T_mt_mwb_maa) -> None:
+    """
+    Drops wrappers and accessors of <module> kept by this package,
+    so that the module can be garbage collected once nothing else uses it.
+    Its lock is kept by `Storage` as long as the module is alive,
+    so accessors obtained before eviction stay synchronized with new wrappers.
+    """
+    module = extract_module(module)
+    ModuleWrapperMeta.evict(module)
+    ModuleAttributeAccessorMeta.evict(module)
+    LazyReloadMixin._stale_instances.pop(module, None)
+
+
+class ReloadBatch:
+    """
+    Reloads several wrappers at once: each lock is acquired once,
+    in the global order (see sort_locks); wrappers are reloaded so that
+    modules others depend on come first, each module is reloaded once;
+    each wrapper or accessor is notified once, with the first reloaded
+    wrapper it shares modules with as the initiator.
+    """
+    metrics: Metrics = metrics
+
+    def __init__(self, wrappers: Sequence[ModuleWrapperBase]):
+        self.wrappers = tuple(dict.fromkeys(wrappers))
+        self.reloaded_modules: Set[ModuleType] = set()
+        self.failed_modules: Set[ModuleType] = set()
+
+    def get_included_modules(self) -> Sequence[ModuleType]:
+        modules = dict()
+        for w in self.wrappers:
+            modules.update(dict.fromkeys(w.get_included_modules()))
+        return tuple(modules)
+
+    def get_included_locks(self) -> Set[T_lock]:
+        locks = set()
+        for w in self.wrappers:
+            locks.update(w.get_included_locks())
+            locks.add(w.lock)
+        return locks
+
+    def get_ordered_wrappers(self) -> List[ModuleWrapperBase]:
+        """Wrappers whose modules others import first, import cycles keep order"""
+        owners = dict()
+        for i, w in enumerate(self.wrappers):
+            for m in w.get_included_modules():
+                owners.setdefault(m.__name__, i)
+        graph = DependencyGraph(self.get_included_modules())
+        dependencies = {i: set() for i in range(len(self.wrappers))}
+        for name, i in owners.items():
+            for d in graph.dependencies.get(name, ()):
+                if owners[d] != i:
+                    dependencies[i].add(owners[d])
+
+        result = list()
+        while dependencies:
+            ready = [i for i, d in dependencies.items() if not d] or [min(dependencies)]
+            for i in ready:
+                del dependencies[i]
+                result.append(self.wrappers[i])
+            for d in dependencies.values():
+                d.difference_update(ready)
+        return result
+
+    def get_initiators(
+        self, wrappers: Sequence[ModuleWrapperBase],
+    ) -> Dict[ModuleWrapperBase, ModuleWrapperBase]:
+        """Instances including modules of <wrappers> -> first of <wrappers> they intersect"""
+        initiators = dict()
+        for w in wrappers:
+            for instance in ModuleWrapperMeta.get_instances_including(w.get_included_modules()):
+                initiators.setdefault(instance, w)
+        return initiators
+
+    def reload(self) -> None:
+        reload_locks = sort_locks(w.reload_lock for w in self.wrappers)
+        acquired = list()
+        try:
+            for l in reload_locks:
+                l.acquire()
+                acquired.append(l)
+            for w in self.wrappers:
+                w.prepare_reload()
+            self.locked_reload()
+        finally:
+            for l in reversed(acquired):
+                l.release()
+
+    def locked_reload(self) -> None:
+        wrappers = self.get_ordered_wrappers()
+        for instance, initiator in self.get_initiators(wrappers).items():
+            instance.before_reload_included(initiator)
+
+        locks = sort_locks(self.get_included_locks())
+
+        acquired = list()
+        acquired_at = None
+        try:
+            for l in locks:
+                l.acquire()
+                acquired.append(l)
+            acquired_at = perf_counter()
+
+            self.failed_modules = set()
+            for w in wrappers:
+                w.reloaded_in_batch = self.reloaded_modules
+                try:
+                    w.do_reload()
+                finally:
+                    w.reloaded_in_batch = None
+                    self.failed_modules.update(w.failed_modules)
+
+        finally:
+            for l in reversed(acquired):
+                l.release()
+            if acquired_at is not None:
+                self.metrics.observe(
+                    'lock_held_seconds', perf_counter() - acquired_at, module='batch',
+                )
+
+        for instance, initiator in self.get_initiators(wrappers).items():
+            instance.after_reload_included(initiator)
+        notified = set()
+        for w in wrappers:
+            modules = [m for m in w.get_included_modules() if m not in notified]
+            notified.update(modules)
+            ModuleAttributeAccessorMeta.after_reload_included(w, modules)
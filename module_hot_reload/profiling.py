@@ -0,0 +1,282 @@
+import ast
+import json
+import sys
+from importlib.machinery import ModuleSpec
+from threading import Lock
+from time import perf_counter, thread_time
+from types import FrameType, ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .import_tracking import DelegatingFinder, DelegatingLoader
+from .utils import get_module_file
+
+
+T_line_map = Dict[int, Tuple[int, str]]
+
+
+class ImportTiming(NamedTuple):
+    name: str
+    parents: Tuple[str, ...]  # enclosing imports, outermost first
+    cumulative: float
+    self: float
+
+
+class StatementTiming(NamedTuple):
+    lineno: int
+    text: str
+    seconds: float
+
+
+class ModuleProfile:
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.failed = False
+        self.imports: List[ImportTiming] = list()
+        self.statements: List[StatementTiming] = list()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'wall': self.wall,
+            'cpu': self.cpu,
+            'failed': self.failed,
+            'imports': [i._asdict() for i in self.imports],
+            'statements': [s._asdict() for s in self.statements],
+        }
+
+
+class ReloadProfile:
+    """
+    Timings of a single reload.
+    <modules> are kept in the order the modules were reloaded in.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.wall = 0.0
+        self.modules: List[ModuleProfile] = list()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'wall': self.wall,
+            'modules': [m.to_dict() for m in self.modules],
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_collapsed(self) -> List[str]:
+        """
+        Lines in "collapsed stacks" format (frame;frame;frame microseconds)
+        understood by flamegraph.pl, speedscope and similar tools.
+        """
+        lines = list()
+        for m in self.modules:
+            own = m.wall - sum(i.cumulative for i in m.imports if not i.parents)
+            lines.append(f'{self.name};{m.name} {max(int(own * 1e6), 0)}')
+            for i in m.imports:
+                stack = ';'.join((self.name, m.name) + i.parents + (i.name,))
+                lines.append(f'{stack} {int(i.self * 1e6)}')
+        return lines
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write('\n'.join(self.to_collapsed()) + '\n')
+
+    def report(self, sort_by: str = 'wall', statements: int = 5) -> str:
+        """
+        Human readable report, modules sorted by <sort_by> ('wall', 'cpu' or
+        'order'), at most <statements> slowest statements per module
+        """
+        modules = list(enumerate(self.modules, 1))
+        if sort_by != 'order':
+            modules.sort(key=lambda item: getattr(item[1], sort_by), reverse=True)
+
+        lines = [f'reload of {self.name}: {self.wall:.6f}s']
+        lines.append(f'{"#":>4} {"wall, s":>10} {"cpu, s":>10}  module')
+        for order, m in modules:
+            failed = ' (failed)' if m.failed else ''
+            lines.append(f'{order:>4} {m.wall:>10.6f} {m.cpu:>10.6f}  {m.name}{failed}')
+            for i in m.imports:
+                indent = '  ' * (len(i.parents) + 1)
+                lines.append(f'{"":>27}{indent}import {i.name}: {i.cumulative:.6f}s')
+            slowest = sorted(m.statements, key=lambda s: s.seconds, reverse=True)
+            for s in slowest[:statements]:
+                lines.append(f'{"":>29}line {s.lineno}: {s.seconds:.6f}s  {s.text}')
+        return '\n'.join(lines)
+
+
+# Nested imports ##############################################################
+
+class _TimingLoader(DelegatingLoader):
+    """Times execution of the module"""
+    def __init__(self, loader: Any, timer: '_ImportTimer'):
+        super().__init__(loader)
+        self.timer = timer
+
+    def exec_module(self, module: ModuleType) -> None:
+        stack = getattr(self.timer._local, 'stack', None)
+        if stack is None:
+            return self.loader.exec_module(module)
+
+        records = self.timer._local.records
+        index = len(records)
+        records.append(None)  # keeps records in the order imports started
+        frame = [module.__name__, 0.0]  # name, time of nested imports
+        stack.append(frame)
+        start = perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            cumulative = perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][1] += cumulative
+            parents = tuple(f[0] for f in stack)
+            records[index] = ImportTiming(
+                module.__name__, parents, cumulative, cumulative - frame[1]
+            )
+
+
+class _ImportTimer(DelegatingFinder):
+    """
+    Times modules imported for the first time by threads which are recording.
+    Installed only while anything is recorded.
+    """
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+        self._users = 0
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+            if self._users == 1:
+                sys.meta_path.insert(0, self)
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self in sys.meta_path:
+                sys.meta_path.remove(self)
+
+    def record(self, records: Optional[List[ImportTiming]], reloaded: str = None) -> None:
+        """
+        Starts recording imports of this thread into <records>, None stops.
+        Module <reloaded> is being reloaded, so it is not recorded as an import.
+        """
+        self._local.records = records
+        self._local.reloaded = reloaded
+        self._local.stack = None if records is None else list()
+
+    def is_active(self, fullname: str) -> bool:
+        return (
+            getattr(self._local, 'stack', None) is not None
+            and fullname != self._local.reloaded
+        )
+
+    def wrap_loader(self, spec: ModuleSpec) -> Optional[Any]:
+        return _TimingLoader(spec.loader, self)
+
+
+import_timer = _ImportTimer()
+
+
+# Top-level statements ########################################################
+
+def _get_line_map(module: ModuleType) -> T_line_map:
+    """line number -> (first line, text) of top-level statement containing it"""
+    path = get_module_file(module)
+    if path is None:
+        return dict()
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+        tree = ast.parse(source)
+    except (OSError, SyntaxError, ValueError):
+        return dict()
+
+    lines = source.decode('utf-8', 'replace').splitlines()
+    line_map = dict()
+    for stmt in tree.body:
+        decorators = getattr(stmt, 'decorator_list', ())
+        first = min([stmt.lineno] + [d.lineno for d in decorators])
+        text = lines[stmt.lineno - 1].strip()[:80] if stmt.lineno <= len(lines) else ''
+        for lineno in range(first, (stmt.end_lineno or stmt.lineno) + 1):
+            line_map[lineno] = (first, text)
+    return line_map
+
+
+class _StatementTracer:
+    """`sys.settrace` tracer timing top-level statements of a single module"""
+    def __init__(self, module: ModuleType):
+        self.namespace = vars(module)
+        self.line_map = _get_line_map(module)
+        self.seconds: Dict[Tuple[int, str], float] = dict()
+        self.current: Optional[Tuple[int, str]] = None
+        self.started = 0.0
+
+    def __call__(self, frame: FrameType, event: str, arg: Any) -> Optional[Callable]:
+        if (
+            event == 'call'
+            and frame.f_globals is self.namespace
+            and frame.f_code.co_name == '<module>'
+        ):
+            return self.trace_module
+        return None
+
+    def trace_module(self, frame: FrameType, event: str, arg: Any) -> Callable:
+        if event == 'line':
+            statement = self.line_map.get(frame.f_lineno, self.current)
+            if statement != self.current:
+                self.stop()
+                self.current = statement
+                self.started = perf_counter()
+        elif event == 'return':
+            self.stop()
+            self.current = None
+        return self.trace_module
+
+    def stop(self) -> None:
+        if self.current is not None:
+            elapsed = perf_counter() - self.started
+            self.seconds[self.current] = self.seconds.get(self.current, 0.0) + elapsed
+
+    def get_statements(self) -> List[StatementTiming]:
+        return [StatementTiming(l, t, s) for (l, t), s in sorted(self.seconds.items())]
+
+
+def profile_module(
+    profile: ReloadProfile,
+    module: ModuleType,
+    reload: Callable[[], None],
+    statements: bool = False,
+) -> None:
+    """
+    Calls <reload> (which reloads <module>) adding timings to <profile>.
+    Must be called between `import_timer.acquire()` and `import_timer.release()`.
+    """
+    module_profile = ModuleProfile(module.__name__)
+    profile.modules.append(module_profile)
+    tracer = _StatementTracer(module) if statements else None
+    previous_trace = sys.gettrace()
+
+    import_timer.record(module_profile.imports, module.__name__)
+    if tracer is not None:
+        sys.settrace(tracer)
+    start, cpu_start = perf_counter(), thread_time()
+    try:
+        reload()
+    except BaseException:
+        module_profile.failed = True
+        raise
+    finally:
+        module_profile.wall = perf_counter() - start
+        module_profile.cpu = thread_time() - cpu_start
+        if tracer is not None:
+            sys.settrace(previous_trace)
+            module_profile.statements = tracer.get_statements()
+        import_timer.record(None)
@@ -1,35 +1,71 @@
+import asyncio
+import os
+import random
+import weakref
+from functools import partial
+from threading import Lock
+from time import monotonic, perf_counter
 from types import ModuleType
-from typing import Dict, Set, Union
-
-from watchdog.observers import Observer
-from watchdog.observers.api import ObservedWatch
+from typing import AsyncIterator, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple, Union
 
+from . import inotify
+from .compilation import get_stat_key
+from .coordination import GenerationChannel
+from .executors import ReloadExecutor
+from .metrics import Metrics, metrics
 from .module_wrappers import (
+    LazyModuleAttributeAccessor,
+    LazyReloadMixin,
     ModuleAttributeAccessor,
     ModuleWrapperBase,
     NewModuleAwareAllModulesRecursiveStandardModuleWrapper,
     NewModuleAwareDirModulesRecursiveStandardModuleWrapper,
     NewModuleUnawareAllModulesRecursiveStandardModuleWrapper,
     NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    ReloadBatch,
+    evict,
+    extract_module,
 )
-from .utils import has_instance_of_class
+from .utils import Debouncer, get_module_entries, get_module_file, has_instance_of_class
+from .watch_manager import Subscription, WatchManager, watch_manager
 from .watchdog_handlers import (
     DirModifiedHandler,
     FileModifiedHandler,
     NewModuleAwareDirModifiedHandler,
+    NewModuleCreatedHandler,
 )
 
 
 T_mt_mwb_maa = Union[ModuleType, ModuleWrapperBase, ModuleAttributeAccessor]
 T_mt_set = Set[ModuleType]
-T_mt_ow = Dict[ModuleType, ObservedWatch]
+T_mt_mt = Dict[ModuleType, ModuleType]
+T_mt_mt_set = Dict[ModuleType, T_mt_set]
+T_mt_s = Dict[ModuleType, Dict[str, Subscription]]
+T_mt_d = Dict[ModuleType, Debouncer]
+T_mt_i = Dict[ModuleType, int]
+T_str_i = Dict[str, int]
+T_str_if = Dict[str, Tuple[int, float]]
+T_mt_str_sk = Dict[ModuleType, Dict[str, Optional[Tuple[int, int]]]]
+T_mt_str_fs = Dict[ModuleType, Dict[str, Optional[FrozenSet[str]]]]
 
 
 class ReloaderBase:
     module_wrapper_class: ModuleWrapperBase = None
+    accessor_class: ModuleAttributeAccessor = ModuleAttributeAccessor
+    metrics: Metrics = metrics
+    # forget wrappers and accessors of unregistered modules,
+    # so that they do not keep the modules alive
+    evict_on_unregister: bool = True
+    # module -> number of reloaders it is registered with, wrappers are shared
+    _registration_counts: T_mt_i = weakref.WeakKeyDictionary()
+    _registration_counts_lock = Lock()
 
     def __init__(self):
         self.registered_modules: T_mt_set = set()
+        # included module -> registered module including it
+        self.module_owners: T_mt_mt = dict()
+        # registered module -> modules it owns
+        self.owned_modules: T_mt_mt_set = dict()
 
     def can_register(self, module: T_mt_mwb_maa, raise_exception: bool = False) -> bool:
         """
@@ -45,16 +81,13 @@ class ReloaderBase:
                 f'{module.module!s} is already registered'
             )
 
-            included_modules = set(module.get_included_modules())
-            for m in self.registered_modules:
-                duplicates: T_mt_set = (
-                    set(self.module_wrapper_class(m).get_included_modules())
-                    .intersection(included_modules)
-                )
-                assert not duplicates, (
-                    f'These modules are already registered: '
-                    f'{list(map(str, duplicates))}'
-                )
+            duplicates = [
+                m for m in module.get_included_modules() if m in self.module_owners
+            ]
+            assert not duplicates, (
+                f'These modules are already registered: '
+                f'{list(map(str, duplicates))}'
+            )
 
             return True
 
@@ -64,6 +97,61 @@ class ReloaderBase:
             else:
                 return False
 
+    def update_owners(self, module: T_mt_mwb_maa) -> None:
+        """Updates ownership index for modules included by registered <module>"""
+        module = self.module_wrapper_class(module)
+        old_modules = self.owned_modules.get(module.module, set())
+        new_modules = set(
+            m for m in module.get_included_modules()
+            if self.module_owners.get(m, module.module) is module.module
+        )
+        for m in old_modules.difference(new_modules):
+            del self.module_owners[m]
+        for m in new_modules.difference(old_modules):
+            self.module_owners[m] = module.module
+        self.owned_modules[module.module] = new_modules
+
+    def add_registered(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        self.registered_modules.add(module.module)
+        self.update_owners(module)
+        with self._registration_counts_lock:
+            counts = ReloaderBase._registration_counts
+            counts[module.module] = counts.get(module.module, 0) + 1
+
+    def remove_registered(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        self.registered_modules.remove(module.module)
+        for m in self.owned_modules.pop(module.module):
+            del self.module_owners[m]
+        with self._registration_counts_lock:
+            counts = ReloaderBase._registration_counts
+            counts[module.module] -= 1
+            if not counts[module.module]:
+                del counts[module.module]
+
+    def evict_unregistered(self, module: T_mt_mwb_maa) -> None:
+        """
+        Evicts unregistered <module> (see evict_on_unregister) unless another
+        reloader still has it registered: wrappers are shared by all reloaders
+        """
+        module = extract_module(module)
+        with self._registration_counts_lock:
+            if module in ReloaderBase._registration_counts:
+                return
+        if self.evict_on_unregister:
+            evict(module)
+
+    def reload_registered(self, module: T_mt_mwb_maa) -> None:
+        """Does nothing if <module> has been unregistered in the meantime"""
+        if extract_module(module) not in self.registered_modules:
+            return
+        module = self.module_wrapper_class(module)
+        self.metrics.increment('reloads_triggered_total', module=module.module.__name__)
+        module.reload()
+        if module.module in self.registered_modules:
+            self.update_owners(module)
+
     def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
         raise NotImplementedError('This is a base class. Override this method')
 
@@ -74,50 +162,165 @@ class ReloaderBase:
 # Automatic Reloaders #########################################################
 
 class AutomaticReloaderBase(ReloaderBase):
-    def __init__(self):
+    """
+    File system events are coalesced per registered module:
+    a burst of events results in a single reload of the module
+    <coalescing_window> seconds after the last event of the burst.
+
+    Reloads are run by a `ReloadExecutor` with <reload_workers> threads,
+    so modules with disjoint lock sets may be reloaded in parallel.
+    With <reload_workers> = 0 reloads run on the thread that detected the change.
+
+    File system is watched through <watch_manager>, by default shared
+    by all reloaders in the process.
+    """
+    coalescing_window: float = 0.1
+    reload_workers: int = 1
+    watch_manager: WatchManager = watch_manager
+
+    def __init__(self, coalescing_window: float = None, reload_workers: int = None):
         super().__init__()
-        self.observer = Observer()
-        self.watches: T_mt_ow = dict()
+        if coalescing_window is not None:
+            self.coalescing_window = coalescing_window
+        if reload_workers is not None:
+            self.reload_workers = reload_workers
+        self.executor = (
+            ReloadExecutor(self.reload_workers) if self.reload_workers > 0 else None
+        )
+        self.watches: T_mt_s = dict()
+        self._started = False
+        self._stopped = False
+        self.debouncers: T_mt_d = dict()
+        self.priorities: T_mt_i = dict()
+        self._unregistered_events_received = 0
+        self._unregistered_reloads_executed = 0
+
+    def set_priority(self, module: T_mt_mwb_maa, priority: int) -> None:
+        """Reloads of modules with higher priority are run first"""
+        module = self.module_wrapper_class(module)
+        self.priorities[module.module] = priority
+
+    def schedule_reload(self, module: T_mt_mwb_maa) -> None:
+        """
+        Called by debouncers, possibly after stop() or unregister():
+        does nothing then, so that evicted wrappers are not created again
+        """
+        if self._stopped or extract_module(module) not in self.registered_modules:
+            return
+        module = self.module_wrapper_class(module)
+        if self.executor is None:
+            self.reload_registered(module)
+            return
+        try:
+            superseded = self.executor.submit(
+                module.module,
+                partial(self.reload_registered, module.module),
+                module.get_included_locks(),
+                self.priorities.get(module.module, 0),
+            )
+        except RuntimeError:
+            if self._stopped:  # stopped since the check above
+                return
+            raise
+        if superseded:
+            self.metrics.increment(
+                'reloads_skipped_total', module=module.module.__name__, reason='superseded'
+            )
+
+    def on_event(self, module: ModuleType) -> None:
+        """Called by file system event handlers"""
+        debouncer = self.debouncers.get(module)
+        if debouncer is not None and not debouncer():
+            self.metrics.increment(
+                'reloads_skipped_total', module=module.__name__, reason='coalesced'
+            )
+
+    @property
+    def events_received(self) -> int:
+        return self._unregistered_events_received + sum(
+            d.calls_received for d in self.debouncers.values()
+        )
+
+    @property
+    def reloads_executed(self) -> int:
+        return self._unregistered_reloads_executed + sum(
+            d.calls_executed for d in self.debouncers.values()
+        )
 
     def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
         module = self.module_wrapper_class(module)
         self.can_register(module, raise_exception=True)
 
+        self.debouncers[module.module] = Debouncer(
+            partial(self.schedule_reload, module.module),
+            self.coalescing_window,
+        )
+        self.watches[module.module] = dict()
+        self.watch(module)
+        self.add_registered(module)
+        return self.accessor_class(module)
+
+    def watch(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        callback = partial(self.on_event, module.module)
+        watches = self.watches[module.module]
+
         if module.is_file:
-            watch = self.observer.schedule(
-                self.file_handler(module.reload, str(module.path)),
-                str(module.path.parent),
-            )
+            path = str(module.path)
+            if path not in watches:
+                watches[path] = self.watch_manager.subscribe(
+                    self.file_handler(callback, path), path,
+                )
 
         if module.is_dir:
-            path = module.path.parent  # module.path -- whatever/__init__.py
-            watch = self.observer.schedule(
-                self.dir_handler(module.reload, str(path)),
-                str(path),
-                recursive=True,
-            )
+            path = str(module.path.parent)  # module.path -- whatever/__init__.py
+            if path not in watches:
+                watches[path] = self.watch_manager.subscribe(
+                    self.dir_handler(callback, path), path, recursive=True,
+                )
 
-        self.watches[module.module] = watch
-        self.registered_modules.add(module.module)
-        return ModuleAttributeAccessor(module)
+    def unwatch(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        for subscription in self.watches.pop(module.module).values():
+            self.watch_manager.unsubscribe(subscription)
 
     def unregister(self, module: T_mt_mwb_maa) -> None:
         module = self.module_wrapper_class(module)
-        self.registered_modules.pop(module.module)
-        watch = self.watches.pop(module.module)
-        self.observer.unschedule(watch)
+        self.remove_registered(module)
+        self.unwatch(module)
+        debouncer = self.debouncers.pop(module.module)
+        debouncer.cancel()
+        if self.executor is not None:
+            self.executor.cancel(module.module)
+        self.priorities.pop(module.module, None)
+        self._unregistered_events_received += debouncer.calls_received
+        self._unregistered_reloads_executed += debouncer.calls_executed
+        self.evict_unregistered(module)
 
     def set_daemon(self, daemonic: bool) -> None:
-        self.observer.setDaemon(daemonic)
+        self.watch_manager.set_daemon(daemonic)
 
     def start(self) -> None:
-        self.observer.start()
+        if self._started or self._stopped:
+            raise RuntimeError('Reloader can only be started once')
+        self._started = True
+        self.watch_manager.start()
 
     def stop(self) -> None:
-        self.observer.stop()
+        """Can be called more than once, the shared observer is released once"""
+        if self._started:
+            self._started = False
+            self.watch_manager.stop()
+        self._stopped = True
+        for debouncer in tuple(self.debouncers.values()):
+            debouncer.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
 
     def join(self, *args, **kwargs) -> None:
-        self.observer.join(*args, **kwargs)
+        self.watch_manager.join(*args, **kwargs)
+        if self.executor is not None:
+            self.executor.join(*args, **kwargs)
 
 
 class NewModuleUnawareAllModulesRecursiveAutomaticReloader(AutomaticReloaderBase):
@@ -150,22 +353,121 @@ class NewModuleAwareDirModulesRecursiveAutomaticReloader(
     dir_handler = NewModuleAwareDirModifiedHandler
 
 
+class ImportedFilesWatchMixin:
+    """
+    Watches only files of included modules instead of whole package trees:
+    each file is watched with a non-recursive watch on its directory.
+    If the reloader is new module aware, creation of .py files and
+    directories next to included packages' files triggers reload too.
+    Watched files are updated after every reload.
+    Must precede an AutomaticReloaderBase subclass in bases.
+    """
+    def watch(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        callback = partial(self.on_event, module.module)
+        watches = self.watches[module.module]
+        new_modules_aware = issubclass(self.dir_handler, NewModuleAwareDirModifiedHandler)
+
+        wanted = dict()
+        for m in module.get_included_modules():
+            file = get_module_file(m)
+            if file is None or not file.endswith('.py'):
+                continue
+            file = os.path.realpath(file)
+            wanted[file] = partial(self.file_handler, callback, file)
+            if new_modules_aware and hasattr(m, '__path__'):
+                directory = os.path.dirname(file)
+                wanted[directory] = partial(NewModuleCreatedHandler, callback, directory)
+
+        for path in tuple(watches):
+            if path not in wanted:
+                self.watch_manager.unsubscribe(watches.pop(path))
+        for path, make_handler in wanted.items():
+            if path not in watches:
+                watches[path] = self.watch_manager.subscribe(make_handler(), path)
+
+    def reload_registered(self, module: T_mt_mwb_maa) -> None:
+        super().reload_registered(module)
+        if extract_module(module) in self.watches:
+            self.watch(module)
+
+
+class LazyAutomaticReloaderMixin:
+    """
+    File system events only mark registered modules stale, modules are
+    reloaded on first access afterwards (see LazyReloadMixin).
+    <module_wrapper_class> must use LazyReloadMixin.
+    Must precede an AutomaticReloaderBase subclass in bases.
+    """
+    accessor_class: ModuleAttributeAccessor = LazyModuleAttributeAccessor
+
+    def __init__(self, *args, **kwargs):
+        if not issubclass(self.module_wrapper_class, LazyReloadMixin):
+            raise TypeError(
+                f'{self.module_wrapper_class.__name__} does not use LazyReloadMixin'
+            )
+        super().__init__(*args, **kwargs)
+
+    def schedule_reload(self, module: T_mt_mwb_maa) -> None:
+        if self._stopped or extract_module(module) not in self.registered_modules:
+            return
+        module = self.module_wrapper_class(module)
+        module.mark_stale(partial(self.reload_registered, module.module))
+
+
+class CoordinatorReloaderMixin:
+    """
+    Watches the file system on behalf of other processes (e.g. workers of
+    a pre-fork server): instead of (or, with <reload_locally>, in addition to)
+    reloading a registered module, increments its generation in <channel>.
+    Followers (see FollowerReloaderMixin) reload it at their safe points.
+    Must precede an AutomaticReloaderBase subclass in bases.
+    """
+    reload_locally: bool = False
+
+    def __init__(self, channel: GenerationChannel, *args, **kwargs):
+        self.channel = channel
+        super().__init__(*args, **kwargs)
+
+    def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
+        module = self.module_wrapper_class(module)
+        self.channel.reserve(module.module.__name__)
+        return super().register(module)
+
+    def reload_registered(self, module: T_mt_mwb_maa) -> None:
+        """Does nothing if <module> has been unregistered in the meantime"""
+        if extract_module(module) not in self.registered_modules:
+            return
+        module = self.module_wrapper_class(module)
+        if self.reload_locally:
+            super().reload_registered(module)
+        self.channel.publish(module.module.__name__)
+        self.metrics.increment(
+            'generations_published_total', module=module.module.__name__
+        )
+
+
 # Manual Reloaders ############################################################
 
 class ManualReloaderBase(ReloaderBase):
     def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
         module = self.module_wrapper_class(module)
         self.can_register(module, raise_exception=True)
-        self.registered_modules.add(module.module)
-        return ModuleAttributeAccessor(module)
+        self.add_registered(module)
+        return self.accessor_class(module)
 
     def unregister(self, module: T_mt_mwb_maa) -> None:
-        module = self.module_wrapper_class(module)
-        self.registered_modules.pop(module.module)
+        self.remove_registered(module)
+        self.evict_unregistered(module)
 
     def reload(self) -> None:
-        for m in self.registered_modules:
-            self.module_wrapper_class(m).reload()
+        """Reloads all registered modules as a single `ReloadBatch`"""
+        wrappers = [self.module_wrapper_class(m) for m in tuple(self.registered_modules)]
+        for w in wrappers:
+            self.metrics.increment('reloads_triggered_total', module=w.module.__name__)
+        ReloadBatch(wrappers).reload()
+        for w in wrappers:
+            self.update_owners(w)
 
 
 class NewModuleUnawareAllModulesRecursiveManualReloader(ManualReloaderBase):
@@ -186,3 +488,299 @@ class NewModuleUnawareDirModulesRecursiveManualReloader(ManualReloaderBase):
 class NewModuleAwareDirModulesRecursiveManualReloader(ManualReloaderBase):
     module_wrapper_class: ModuleWrapperBase = \
         NewModuleAwareDirModulesRecursiveStandardModuleWrapper
+
+
+class FollowerReloaderMixin:
+    """
+    Reloads registered modules whose generation in <channel> was incremented
+    by a coordinator (see CoordinatorReloaderMixin). Nothing happens until
+    poll() is called, so reloads only happen at points of the caller's choice.
+
+    With <stagger> > 0 a reload is postponed by a random delay of up to
+    <stagger> seconds, so that followers do not all reload at once.
+    With <catch_up> modules already published before registration
+    are reloaded by the first poll(), e.g. in workers forked from a process
+    which did not reload them.
+    Must precede a ManualReloaderBase subclass in bases.
+    """
+    stagger: float = 0.0
+    catch_up: bool = True
+
+    def __init__(
+        self, channel: GenerationChannel, *args,
+        stagger: float = None, catch_up: bool = None, **kwargs,
+    ):
+        self.channel = channel
+        if stagger is not None:
+            self.stagger = stagger
+        if catch_up is not None:
+            self.catch_up = catch_up
+        self.applied_generations: T_str_i = dict()
+        self.due_reloads: T_str_if = dict()  # name -> (generation, due time)
+        self._channel_generation = -1
+        self._channel_epoch = channel.epoch
+        super().__init__(*args, **kwargs)
+
+    def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
+        name = self.module_wrapper_class(module).module.__name__
+        accessor = super().register(module)
+        if self.catch_up:
+            self.applied_generations[name] = 0
+        else:
+            self.applied_generations[name] = self.channel.read()[1].get(name, 0)
+        self._channel_generation = -1  # make next poll() read the channel
+        return accessor
+
+    def unregister(self, module: T_mt_mwb_maa) -> None:
+        name = self.module_wrapper_class(module).module.__name__
+        super().unregister(module)
+        self.applied_generations.pop(name, None)
+        self.due_reloads.pop(name, None)
+
+    def poll(self) -> List[ModuleType]:
+        """
+        Reloads modules with new generations that are due.
+        Cheap when nothing was published. Returns reloaded modules.
+        """
+        if (
+            self.channel.get_generation() != self._channel_generation
+            or self.channel.epoch != self._channel_epoch
+        ):
+            self.read_channel()
+        if not self.due_reloads:
+            return []
+
+        now = monotonic()
+        modules = {m.__name__: m for m in self.registered_modules}
+        reloaded = list()
+        for name, (generation, due_time) in tuple(self.due_reloads.items()):
+            if due_time > now:
+                continue
+            del self.due_reloads[name]
+            self.applied_generations[name] = generation
+            self.reload_registered(modules[name])
+            self.metrics.increment('generations_applied_total', module=name)
+            reloaded.append(modules[name])
+        return reloaded
+
+    def read_channel(self) -> None:
+        channel_generation, generations = self.channel.read()
+        if self.channel.epoch != self._channel_epoch:
+            # the channel was created anew by a restarted coordinator
+            self.applied_generations = dict.fromkeys(self.applied_generations, 0)
+            self.due_reloads = dict()
+            self._channel_epoch = self.channel.epoch
+        self._channel_generation = channel_generation
+
+        now = monotonic()
+        for name, applied in self.applied_generations.items():
+            generation = generations.get(name, 0)
+            if generation <= applied:
+                continue
+            if name in self.due_reloads:
+                self.due_reloads[name] = (generation, self.due_reloads[name][1])
+            else:
+                delay = random.uniform(0, self.stagger) if self.stagger > 0 else 0.0
+                self.due_reloads[name] = (generation, now + delay)
+
+
+# Asyncio Reloaders ###########################################################
+
+class ReloadResult(NamedTuple):
+    module: ModuleType
+    seconds: float
+
+
+class AsyncReloaderBase(ReloaderBase):
+    """
+    Reloader for asyncio applications, uses no threads.
+    On Linux file system notifications are read by the running event loop
+    (inotify, see `InotifyObserver`, through `loop.add_reader()`). Elsewhere,
+    or without <use_notifications>, files of included modules are polled
+    with os.stat() every <poll_interval> seconds instead.
+    A module counts as changed when size or mtime of one of its files changed
+    or, with <new_module_aware>, .py files or packages were added to or removed
+    from directories of its files. Other files (editor swap files, temporary
+    files) are ignored. Changes are reported by `await changed()`, reloads
+    happen when the application calls `await reload()` or iterates over
+    the reloader:
+
+    `async for result in reloader: ...`
+
+    Reloads run under <lock>, an `asyncio.Lock`: coroutines that must not
+    see a reload between their awaits can hold it (`async with reloader.lock`).
+    Call close() once the reloader is not used anymore.
+    """
+    poll_interval: float = 0.5
+    coalescing_window: float = 0.1
+    use_notifications: bool = True
+    new_module_aware: bool = False
+
+    def __init__(self, poll_interval: float = None, coalescing_window: float = None):
+        super().__init__()
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+        if coalescing_window is not None:
+            self.coalescing_window = coalescing_window
+        self.lock = asyncio.Lock()
+        self.stat_keys: T_mt_str_sk = dict()  # files
+        self.entry_keys: T_mt_str_fs = dict()  # directories, with <new_module_aware>
+        self._observer: Optional[inotify.InotifyObserver] = None
+        self._observer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._observer_watches: Dict[str, inotify.InotifyWatch] = dict()
+        self._notified: Optional[asyncio.Event] = None
+
+    def register(self, module: T_mt_mwb_maa) -> ModuleAttributeAccessor:
+        module = self.module_wrapper_class(module)
+        self.can_register(module, raise_exception=True)
+        self.add_registered(module)
+        self.take_stat_keys(module)
+        return self.accessor_class(module)
+
+    def unregister(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        self.remove_registered(module)
+        self.stat_keys.pop(module.module, None)
+        self.entry_keys.pop(module.module, None)
+        self.update_watches()
+        self.evict_unregistered(module)
+
+    def take_stat_keys(self, module: T_mt_mwb_maa) -> None:
+        module = self.module_wrapper_class(module)
+        paths = set()
+        for m in module.get_included_modules():
+            path = get_module_file(m)
+            if path is not None:
+                paths.add(path)
+        self.stat_keys[module.module] = {p: get_stat_key(p) for p in paths}
+        if self.new_module_aware:
+            self.entry_keys[module.module] = {
+                d: get_module_entries(d) for d in set(map(os.path.dirname, paths))
+            }
+        self.update_watches()
+
+    def is_changed(self, module: T_mt_mwb_maa) -> bool:
+        module = self.module_wrapper_class(module)
+        return any(
+            get_stat_key(p) != key for p, key in self.stat_keys[module.module].items()
+        ) or any(
+            get_module_entries(d) != key
+            for d, key in self.entry_keys.get(module.module, dict()).items()
+        )
+
+    # Notifications ###########################################################
+
+    def start_notifications(self) -> bool:
+        """
+        Starts reading file system notifications in the running event loop,
+        returns False if they are not available
+        """
+        if self._observer is not None:
+            return True
+        if not inotify.is_available():
+            return False
+        loop = asyncio.get_running_loop()
+        observer = inotify.InotifyObserver()
+        try:
+            loop.add_reader(observer.fileno(), observer.read)
+        except NotImplementedError:  # event loop without add_reader()
+            observer.close()
+            return False
+        self._observer = observer
+        self._observer_loop = loop
+        self._notified = asyncio.Event()
+        self.update_watches()
+        return True
+
+    def update_watches(self) -> None:
+        """Watches directories of files of registered modules"""
+        if self._observer is None:
+            return
+        directories = set(
+            os.path.dirname(p) for keys in self.stat_keys.values() for p in keys
+        )
+        for d in tuple(self._observer_watches):
+            if d not in directories:
+                self._observer.unschedule(self._observer_watches.pop(d))
+        for d in directories:
+            if d not in self._observer_watches:
+                self._observer_watches[d] = self._observer.schedule(
+                    NewModuleAwareDirModifiedHandler(self._notified.set, d), d,
+                )
+
+    def close(self) -> None:
+        """Stops reading file system notifications"""
+        if self._observer is not None:
+            self._observer_loop.remove_reader(self._observer.fileno())
+            self._observer.close()
+            self._observer = None
+            self._observer_loop = None
+            self._observer_watches.clear()
+            self._notified = None
+
+    def get_changed(self) -> List[ModuleType]:
+        return [m for m in tuple(self.registered_modules) if self.is_changed(m)]
+
+    async def changed(self) -> List[ModuleType]:
+        """
+        Waits until files of registered modules change,
+        returns these modules (without reloading them)
+        """
+        if self.use_notifications:
+            self.start_notifications()
+        while True:
+            if self._notified is not None:
+                self._notified.clear()
+            changed = self.get_changed()
+            if changed:
+                # let bursts of writes (e.g. editor saves) settle
+                await asyncio.sleep(self.coalescing_window)
+                return self.get_changed() or changed
+            if self._notified is not None:
+                # woken up by any .py event of watched directories,
+                # the stat keys decide whether a module changed
+                await self._notified.wait()
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    async def reload(self, modules: List[ModuleType] = None) -> List[ReloadResult]:
+        """Reloads <modules>, by default registered modules whose files changed"""
+        if modules is None:
+            modules = self.get_changed()
+        results = list()
+        async with self.lock:
+            for m in modules:
+                if m not in self.registered_modules:
+                    continue
+                start = perf_counter()
+                self.reload_registered(m)
+                self.take_stat_keys(m)
+                results.append(ReloadResult(m, perf_counter() - start))
+        return results
+
+    async def __aiter__(self) -> AsyncIterator[ReloadResult]:
+        while True:
+            for result in await self.reload(await self.changed()):
+                yield result
+
+
+class NewModuleUnawareAllModulesRecursiveAsyncReloader(AsyncReloaderBase):
+    module_wrapper_class: ModuleWrapperBase = \
+        NewModuleUnawareAllModulesRecursiveStandardModuleWrapper
+
+
+class NewModuleAwareAllModulesRecursiveAsyncReloader(AsyncReloaderBase):
+    module_wrapper_class: ModuleWrapperBase = \
+        NewModuleAwareAllModulesRecursiveStandardModuleWrapper
+    new_module_aware: bool = True
+
+
+class NewModuleUnawareDirModulesRecursiveAsyncReloader(AsyncReloaderBase):
+    module_wrapper_class: ModuleWrapperBase = \
+        NewModuleUnawareDirModulesRecursiveStandardModuleWrapper
+
+
+class NewModuleAwareDirModulesRecursiveAsyncReloader(AsyncReloaderBase):
+    module_wrapper_class: ModuleWrapperBase = \
+        NewModuleAwareDirModulesRecursiveStandardModuleWrapper
+    new_module_aware: bool = True
@@ -0,0 +1,51 @@
+from types import ModuleType
+from typing import Any, Dict, NamedTuple, Sequence
+
+
+_missing = object()
+
+
+class PreservedState(NamedTuple):
+    values: Dict[str, Any]  # kept globals
+    saved: Any  # result of __reload_save__()
+
+
+def get_kept_names(module: ModuleType) -> Sequence[str]:
+    names = vars(module).get('__reload_keep__', ())
+    return (names,) if isinstance(names, str) else tuple(names)
+
+
+def get_state_key(module: ModuleType) -> Any:
+    """Result of module's `__reload_key__()`, None if it is not defined or fails"""
+    get_key = vars(module).get('__reload_key__')
+    if get_key is None:
+        return None
+    try:
+        return get_key()
+    except Exception:
+        return _missing  # never equal to a recorded key
+
+
+def save_state(module: ModuleType) -> PreservedState:
+    namespace = vars(module)
+    values = {n: namespace[n] for n in get_kept_names(module) if n in namespace}
+    save = namespace.get('__reload_save__')
+    return PreservedState(values, save() if save is not None else _missing)
+
+
+def drop_state(module: ModuleType, state: PreservedState) -> None:
+    """Removes kept globals, so that the module body computes them again"""
+    namespace = vars(module)
+    for name in state.values:
+        namespace.pop(name, None)
+
+
+def restore_state(module: ModuleType, state: PreservedState) -> None:
+    namespace = vars(module)
+    kept_names = get_kept_names(module)
+    for name, value in state.values.items():
+        if name in kept_names:
+            namespace[name] = value
+    restore = namespace.get('__reload_restore__')
+    if restore is not None and state.saved is not _missing:
+        restore(state.saved)
@@ -1,5 +1,11 @@
+import os
 from pathlib import Path
+from threading import Lock, Thread
+from time import monotonic, sleep
 from types import ModuleType
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+from .locks import shared_side
 
 
 def is_path_in_path(path_1: Path, path_2: Path) -> bool:
@@ -8,6 +14,28 @@ def is_path_in_path(path_1: Path, path_2: Path) -> bool:
     return path_1 in path_2
 
 
+def is_subpath(path: str, parent: str) -> bool:
+    """Both paths are expected to be normalized the same way"""
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+_file_dirs: Dict[str, str] = dict()
+
+
+def get_file_dir(file: str) -> str:
+    """Resolved directory of <file>, cached"""
+    directory = _file_dirs.get(file)
+    if directory is None:
+        directory = _file_dirs[file] = str(Path(file).resolve().parent)
+    return directory
+
+
+def prime_file_dirs(file_dirs: Mapping[str, str]) -> None:
+    """Fills get_file_dir() cache with already known results, e.g. from a disk cache"""
+    for file, directory in file_dirs.items():
+        _file_dirs.setdefault(file, directory)
+
+
 def dirname(path: Path):
     if path.is_dir():
         return path
@@ -16,17 +44,97 @@ def dirname(path: Path):
 
 
 def has_instance_of_class(module: ModuleType, cls: type):
-    for attribute_name in dir(module):
-        attribute = getattr(module, attribute_name)
-        if isinstance(attribute, cls):
-            return True
-    return False
+    return any(isinstance(attribute, cls) for attribute in tuple(vars(module).values()))
+
 
+def get_module_file(module: ModuleType) -> Optional[str]:
+    return getattr(module, '__file__', None)
 
-def locked_method(lock_attribute_name: str = 'lock'):
+
+def get_module_entries(directory: str) -> Optional[FrozenSet[str]]:
+    """
+    Names of .py files and package directories in <directory>, None if it
+    cannot be listed. Other files (editor swap files, caches) are not included.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(
+                e.name for e in entries
+                if e.name.endswith('.py') and not e.is_dir()
+                or e.name != '__pycache__' and e.is_dir()
+                and os.path.exists(os.path.join(e.path, '__init__.py'))
+            )
+    except OSError:
+        return None
+
+
+def locked_method(lock_attribute_name: str = 'lock', shared: bool = False):
+    """
+    With <shared> the method takes shared side of the lock
+    if the lock is a readers-writer one.
+    """
     def decorator(func):
         def decorated(self, *args, **kwargs):
-            with getattr(self, lock_attribute_name):
+            lock = getattr(self, lock_attribute_name)
+            with (shared_side(lock) if shared else lock):
                 return func(self, *args, **kwargs)
         return decorated
     return decorator
+
+
+def sort_locks(locks: Iterable[Any]) -> List[Any]:
+    """
+    Distinct <locks> in the global acquisition order. Threads acquiring
+    overlapping sets of locks in this order cannot deadlock each other.
+    """
+    return sorted(set(locks), key=id)
+
+
+class Debouncer:
+    """
+    Calls <callback> once per quiet period: every call postpones
+    the actual call by <delay> seconds, so a burst of calls
+    results in a single call of <callback> after the burst is over.
+    With <delay> <= 0 <callback> is called immediately.
+    """
+    def __init__(self, callback: Callable[[], None], delay: float):
+        self.callback = callback
+        self.delay = delay
+        self.lock = Lock()
+        self.deadline = 0.0
+        self.pending = False
+        self.calls_received = 0
+        self.calls_executed = 0
+
+    def __call__(self) -> bool:
+        """Returns False if the call was coalesced with a pending one"""
+        with self.lock:
+            self.calls_received += 1
+            if self.delay <= 0:
+                self.calls_executed += 1
+            else:
+                self.deadline = monotonic() + self.delay
+                if self.pending:
+                    return False
+                self.pending = True
+                Thread(target=self._wait_and_call, daemon=True).start()
+                return True
+        self.callback()
+        return True
+
+    def _wait_and_call(self) -> None:
+        while True:
+            with self.lock:
+                if not self.pending:  # cancelled
+                    return
+                remaining = self.deadline - monotonic()
+                if remaining <= 0:
+                    self.pending = False
+                    self.calls_executed += 1
+                    break
+            sleep(remaining)
+        self.callback()
+
+    def cancel(self) -> None:
+        with self.lock:
+            self.pending = False
@@ -0,0 +1,197 @@
+import os
+from threading import RLock
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+from .utils import is_subpath
+
+
+T_handlers = Dict[str, List[Any]]
+T_observer = Any  # watchdog's BaseObserver or InotifyObserver
+T_watch = Any
+
+
+def get_default_observer_class() -> Callable[[], T_observer]:
+    """watchdog's Observer, imported only when a WatchManager first starts"""
+    from watchdog.observers import Observer
+    return Observer
+
+
+class Subscription(NamedTuple):
+    handler: Any  # anything with dispatch(event)
+    path: str
+    recursive: bool
+    is_dir: bool
+
+
+class _RoutingHandler:
+    def __init__(self, manager: 'WatchManager'):
+        self.manager = manager
+
+    def dispatch(self, event: Any) -> None:
+        self.manager.route(event)
+
+
+class WatchManager:
+    """
+    Shares a single observer between all automatic reloaders.
+
+    Subscriptions are to a single file, to files directly in a directory
+    or to a whole directory tree (<recursive> = True).
+    There is at most one watch per directory, directories covered by
+    a recursive watch of a parent are not watched separately.
+    Each event is routed only to handlers subscribed to its path
+    or to a directory containing it.
+
+    <observer_class> is watchdog's Observer by default;
+    `module_hot_reload.inotify.InotifyObserver` may be used on Linux.
+    An observer (and its watches) exists only while the manager is started,
+    so <observer_class> may be changed whenever it is stopped.
+    """
+    def __init__(self, observer_class: Optional[Callable[[], T_observer]] = None):
+        self.observer_class = observer_class
+        self._lock = RLock()
+        self._observer: Optional[T_observer] = None
+        self._stopped_observers: List[T_observer] = list()
+        self._daemon = True
+        self._starts = 0
+        self._subscriptions: Set[Subscription] = set()
+        self._watches: Dict[str, T_watch] = dict()
+        self._watches_recursive: Dict[str, bool] = dict()
+        # replaced as a whole on change, so route() needs no lock
+        self._file_routes: T_handlers = dict()
+        self._children_routes: T_handlers = dict()
+        self._dir_routes: T_handlers = dict()
+        self._routing_handler = _RoutingHandler(self)
+
+    @property
+    def watch_count(self) -> int:
+        return len(self._watches)
+
+    def _get_observer(self) -> T_observer:
+        if self._observer is None:
+            observer_class = self.observer_class or get_default_observer_class()
+            self._observer = observer_class()
+            self._observer.daemon = self._daemon
+            self._watches = dict()
+            self._watches_recursive = dict()
+        return self._observer
+
+    def subscribe(self, handler: Any, path: str, recursive: bool = False) -> Subscription:
+        path = os.path.normpath(str(path))
+        subscription = Subscription(handler, path, recursive, os.path.isdir(path))
+        with self._lock:
+            self._subscriptions.add(subscription)
+            self._update()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            self._update()
+
+    def _update(self) -> None:
+        file_routes: T_handlers = dict()
+        children_routes: T_handlers = dict()
+        dir_routes: T_handlers = dict()
+        wanted: Dict[str, bool] = dict()
+        for s in self._subscriptions:
+            if s.recursive:
+                dir_routes.setdefault(s.path, list()).append(s.handler)
+                wanted[s.path] = True
+            elif s.is_dir:
+                children_routes.setdefault(s.path, list()).append(s.handler)
+                wanted.setdefault(s.path, False)
+            else:
+                file_routes.setdefault(s.path, list()).append(s.handler)
+                wanted.setdefault(os.path.dirname(s.path), False)
+
+        recursive_dirs = [d for d, r in wanted.items() if r]
+        wanted = {
+            d: r for d, r in wanted.items()
+            if not any(p != d and is_subpath(d, p) for p in recursive_dirs)
+        }
+
+        self._file_routes = file_routes
+        self._children_routes = children_routes
+        self._dir_routes = dir_routes
+        self._sync_watches(wanted)
+
+    def _sync_watches(self, wanted: Dict[str, bool]) -> None:
+        if self._starts == 0:
+            return  # scheduled by start()
+        observer = self._get_observer()
+        for path in tuple(self._watches):
+            if wanted.get(path) != self._watches_recursive[path]:
+                observer.unschedule(self._watches.pop(path))
+                del self._watches_recursive[path]
+        for path, recursive in wanted.items():
+            if path not in self._watches:
+                self._watches[path] = observer.schedule(
+                    self._routing_handler, path, recursive=recursive
+                )
+                self._watches_recursive[path] = recursive
+
+    def route(self, event: Any) -> None:
+        file_routes = self._file_routes
+        children_routes = self._children_routes
+        dir_routes = self._dir_routes
+
+        handlers = list()
+        paths = [event.src_path]
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            paths.append(dest_path)
+        for path in paths:
+            handlers.extend(file_routes.get(path, ()))
+            handlers.extend(children_routes.get(os.path.dirname(path), ()))
+            directory = path
+            while True:
+                handlers.extend(dir_routes.get(directory, ()))
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+
+        for handler in dict.fromkeys(handlers):  # unique, ordered
+            handler.dispatch(event)
+
+    def set_daemon(self, daemonic: bool) -> None:
+        with self._lock:
+            self._daemon = daemonic
+            if self._observer is not None and not self._observer.is_alive():
+                self._observer.daemon = daemonic
+
+    def start(self) -> None:
+        """Starts the observer on first call, calls must be paired with stop()"""
+        with self._lock:
+            self._starts += 1
+            if self._starts == 1:
+                self._update()
+                self._get_observer().start()
+
+    def stop(self) -> None:
+        """Does nothing if not started"""
+        with self._lock:
+            if self._starts == 0:
+                return
+            self._starts -= 1
+            if self._starts == 0 and self._observer is not None:
+                self._observer.stop()
+                self._stopped_observers.append(self._observer)
+                self._observer = None
+                self._watches = dict()
+                self._watches_recursive = dict()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Waits for stopped observers to finish"""
+        with self._lock:
+            observers = tuple(self._stopped_observers)
+        for observer in observers:
+            observer.join(timeout)
+            if not observer.is_alive():
+                with self._lock:
+                    if observer in self._stopped_observers:
+                        self._stopped_observers.remove(observer)
+
+
+watch_manager = WatchManager()
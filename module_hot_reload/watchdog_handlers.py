@@ -1,30 +1,74 @@
 from pathlib import Path
-from typing import Callable, Union
+from typing import Any, Callable, NamedTuple, Union
 
-from watchdog.events import (
-    FileModifiedEvent,
-    FileSystemEvent,
-    FileSystemEventHandler,
-    FileSystemMovedEvent,
-)
+from .metrics import Metrics, metrics
 
 
 T_action = Callable[[], None]
 T_str_path = Union[str, Path]
 
+EVENT_TYPE_MODIFIED = 'modified'
+EVENT_TYPE_CREATED = 'created'
+EVENT_TYPE_DELETED = 'deleted'
+EVENT_TYPE_MOVED = 'moved'
 
-class FileModifiedHandler(FileSystemEventHandler):
+
+class FileSystemEvent(NamedTuple):
+    """
+    Event as produced by the inotify backend. Handlers only rely on these
+    attributes, which watchdog's events have as well.
+    """
+    event_type: str
+    src_path: str
+    is_directory: bool
+    dest_path: str = ''
+
+
+class FileSystemEventHandler:
+    """
+    Dispatches events to on_<event type>() methods like watchdog's class
+    of the same name, so that handlers work with watchdog observers
+    without this module importing watchdog.
+    """
+    def dispatch(self, event: Any) -> None:
+        method = getattr(self, f'on_{event.event_type}', None)
+        if method is not None:
+            method(event)
+
+    def on_modified(self, event: Any) -> None:
+        pass
+
+    def on_created(self, event: Any) -> None:
+        pass
+
+    def on_deleted(self, event: Any) -> None:
+        pass
+
+    def on_moved(self, event: Any) -> None:
+        pass
+
+
+class CountingHandlerMixin:
+    """Counts every received event as `events_received_total`"""
+    metrics: Metrics = metrics
+
+    def dispatch(self, event: FileSystemEvent):
+        self.metrics.increment('events_received_total', handler=type(self).__name__)
+        super().dispatch(event)
+
+
+class FileModifiedHandler(CountingHandlerMixin, FileSystemEventHandler):
     def __init__(self, callback: T_action, file_path: T_str_path):
         self.file_path = str(file_path)
         self.callback = callback
         super().__init__()
 
-    def on_modified(self, event: FileModifiedEvent):
+    def on_modified(self, event: FileSystemEvent):
         if not event.is_directory and self.file_path == event.src_path:
             self.callback()
 
 
-class DirModifiedHandler(FileSystemEventHandler):
+class DirModifiedHandler(CountingHandlerMixin, FileSystemEventHandler):
     """
     Reacts to modifications of .py files,
     """
@@ -56,6 +100,15 @@ class NewModuleAwareDirModifiedHandler(DirModifiedHandler):
     # def on_deleted(self, event: FileSystemEvent):
     #     self._check_and_call(event)
 
-    def on_moved(self, event: FileSystemMovedEvent):
+    def on_moved(self, event: FileSystemEvent):
         if self.dir_path in event.dest_path:
             self._check_and_call(event)
+
+
+class NewModuleCreatedHandler(NewModuleAwareDirModifiedHandler):
+    """
+    Reacts only to creation or moving into <dir_path>
+    of .py files and directories.
+    """
+    def on_modified(self, event: FileSystemEvent):
+        pass
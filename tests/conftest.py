@@ -0,0 +1,58 @@
+import importlib
+import sys
+
+import pytest
+
+
+class FakeObserver:
+    """Observer that watches nothing, for WatchManager(FakeObserver)"""
+    def __init__(self):
+        self.daemon = True
+        self.scheduled = list()
+        self.started = False
+        self.stopped = False
+
+    def schedule(self, handler, path, recursive=False):
+        watch = (handler, path, recursive)
+        self.scheduled.append(watch)
+        return watch
+
+    def unschedule(self, watch):
+        self.scheduled.remove(watch)
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+    def is_alive(self):
+        return self.started and not self.stopped
+
+    def join(self, timeout=None):
+        pass
+
+
+@pytest.fixture
+def make_package(tmp_path, monkeypatch):
+    """
+    make_package('pkg', {'__init__.py': ..., 'sub.py': ...}) writes the files
+    to a temporary directory on sys.path and imports package 'pkg'
+    """
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = list()
+
+    def make(name, files):
+        for file, source in files.items():
+            path = tmp_path / name / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(source)
+        names.append(name)
+        importlib.invalidate_caches()
+        return importlib.import_module(name)
+
+    yield make
+
+    for module_name in tuple(sys.modules):
+        if module_name.split('.')[0] in names:
+            del sys.modules[module_name]
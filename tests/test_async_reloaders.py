@@ -0,0 +1,78 @@
+import asyncio
+import os
+
+import pytest
+
+from module_hot_reload import inotify
+from module_hot_reload.reloaders import (
+    NewModuleAwareDirModulesRecursiveAsyncReloader,
+    NewModuleUnawareDirModulesRecursiveAsyncReloader,
+)
+
+
+def bump(path, source):
+    """Writes <source> with a later mtime, so that the change is seen"""
+    path.write_text(source)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+async def get_changed(reloader, timeout=0.3):
+    try:
+        return await asyncio.wait_for(reloader.changed(), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+@pytest.fixture(params=[True, False], ids=['notifications', 'polling'])
+def use_notifications(request):
+    return request.param
+
+
+def test_changed_ignores_other_files(tmp_path, make_package, use_notifications):
+    pkg = make_package('pkg', {'__init__.py': 'x = 1\n'})
+
+    async def main():
+        reloader = NewModuleUnawareDirModulesRecursiveAsyncReloader(
+            poll_interval=0.01, coalescing_window=0.01,
+        )
+        reloader.use_notifications = use_notifications
+        reloader.register(pkg)
+        try:
+            task = asyncio.ensure_future(get_changed(reloader))
+            await asyncio.sleep(0.05)
+            notified = use_notifications and inotify.is_available()
+            assert (reloader._observer is not None) == notified
+            (tmp_path / 'pkg' / '.__init__.py.swp').write_text('')
+            (tmp_path / 'pkg' / 'new.py').write_text('')  # unaware of new modules
+            assert await task is None
+
+            bump(tmp_path / 'pkg' / '__init__.py', 'x = 2\n')
+            assert await get_changed(reloader, 5) == [pkg]
+            await reloader.reload([pkg])
+            assert pkg.x == 2
+        finally:
+            reloader.close()
+
+    asyncio.run(main())
+
+
+def test_new_module_aware_notices_new_modules(tmp_path, make_package, use_notifications):
+    pkg = make_package('pkg', {'__init__.py': ''})
+
+    async def main():
+        reloader = NewModuleAwareDirModulesRecursiveAsyncReloader(
+            poll_interval=0.01, coalescing_window=0.01,
+        )
+        reloader.use_notifications = use_notifications
+        reloader.register(pkg)
+        try:
+            task = asyncio.ensure_future(get_changed(reloader, 5))
+            await asyncio.sleep(0.05)
+            (tmp_path / 'pkg' / 'notes.txt').write_text('')
+            (tmp_path / 'pkg' / 'new.py').write_text('')
+            assert await task == [pkg]
+        finally:
+            reloader.close()
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+import pytest
+
+from module_hot_reload.metrics import Metrics
+from module_hot_reload.module_wrappers import (
+    CodePatchingDoReloadMixin,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    evict,
+)
+
+
+class Wrapper(CodePatchingDoReloadMixin, NewModuleUnawareDirModulesRecursiveStandardModuleWrapper):
+    metrics = Metrics()
+
+
+SOURCE = '''\
+STATE = []
+
+
+def f():
+    return 1
+
+
+class Base:
+    def g(self):
+        return 'base'
+
+
+class C(Base):
+    def g(self):
+        return 'c'
+'''
+
+
+@pytest.fixture
+def reload_with(tmp_path, make_package):
+    """reload_with(source) rewrites pkg/__init__.py and reloads it, returns pkg"""
+    pkg = make_package('pkg', {'__init__.py': SOURCE})
+    wrapper = Wrapper(pkg)
+    Wrapper.metrics.reset()
+
+    def reload(source):
+        (tmp_path / 'pkg' / '__init__.py').write_text(source)
+        wrapper.reload()
+        return pkg
+
+    yield reload
+    evict(pkg)
+
+
+def was_patched():
+    return Wrapper.metrics.get_counter('modules_patched_total', module='pkg') == 1
+
+
+def test_body_change_is_patched(reload_with):
+    import pkg
+    state, f = pkg.STATE, pkg.f
+    reload_with(SOURCE.replace('return 1', 'return 2'))
+    assert pkg.f is f
+    assert pkg.f() == 2
+    assert pkg.STATE is state
+    assert was_patched()
+
+
+def test_structural_change_reloads(reload_with):
+    import pkg
+    state = pkg.STATE
+    reload_with(SOURCE + '\nX = 1\n')
+    assert pkg.STATE is not state
+    assert pkg.X == 1
+    assert not was_patched()
+
+
+def test_line_shift_updates_first_line(reload_with):
+    import pkg
+    f = pkg.f
+    first_line = f.__code__.co_firstlineno
+    reload_with(SOURCE.replace('STATE = []\n', 'STATE = [\n]\n'))
+    assert pkg.f is f
+    assert f.__code__.co_firstlineno == first_line + 1
+
+
+def test_super_change_reloads(reload_with):
+    import pkg
+    state = pkg.STATE
+    reload_with(SOURCE.replace("return 'c'", "return super().g() + 'c'"))
+    assert pkg.STATE is not state
+    assert pkg.C().g() == 'basec'
+    assert not was_patched()
+
+
+def test_closure_cell_change_reloads(reload_with):
+    """A `__class__` cell (as used by super()) cannot be added to the old function"""
+    import pkg
+    state = pkg.STATE
+    reload_with(SOURCE.replace("return 'c'", "return __class__.__name__"))
+    assert pkg.STATE is not state
+    assert pkg.C().g() == 'C'
+    assert not was_patched()
+
+
+def test_nested_closure_is_patched(reload_with):
+    import pkg
+    reload_with(SOURCE.replace(
+        '    return 1', '    x = 3\n\n    def inner():\n        return x\n    return inner()',
+    ))
+    assert pkg.f() == 3
+    assert was_patched()
+
+
+def test_comment_only_change_is_not_executed(reload_with):
+    import pkg
+    state = pkg.STATE
+    reload_with(SOURCE.replace('return 1', 'return 1  # one'))
+    assert pkg.STATE is state
+    assert pkg.f() == 1
@@ -0,0 +1,88 @@
+import pytest
+
+from module_hot_reload import module_wrappers
+from module_hot_reload.compilation import compile_sources, exec_compiled
+from module_hot_reload.metrics import Metrics
+from module_hot_reload.module_wrappers import (
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    PrecompiledDoReloadMixin,
+    evict,
+)
+
+
+class Wrapper(PrecompiledDoReloadMixin, NewModuleUnawareDirModulesRecursiveStandardModuleWrapper):
+    metrics = Metrics()
+    # source written between compilation and execution
+    late_source = None
+
+    def prepare_reload(self):
+        super().prepare_reload()
+        if self.late_source is not None:
+            self.path.write_text(self.late_source)
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """Modules reloaded by executing precompiled code"""
+    modules = list()
+
+    def record(module, code):
+        modules.append(module)
+        exec_compiled(module, code)
+
+    monkeypatch.setattr(module_wrappers, 'exec_compiled', record)
+    return modules
+
+
+def test_precompiled_code_is_executed(tmp_path, make_package, executed):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        (tmp_path / 'pkg' / '__init__.py').write_text('V = 2  # changed\n')
+        Wrapper(pkg).reload()
+        assert pkg.V == 2
+        assert executed == [pkg]
+    finally:
+        evict(pkg)
+
+
+def test_file_changed_after_compilation_is_reloaded(tmp_path, make_package, executed):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        wrapper = Wrapper(pkg)
+        wrapper.late_source = 'V = 3  # changed later\n'
+        (tmp_path / 'pkg' / '__init__.py').write_text('V = 2  # changed\n')
+        wrapper.reload()
+        assert pkg.V == 3
+        assert executed == []
+    finally:
+        evict(pkg)
+
+
+def test_compile_error_is_reported_by_reload(tmp_path, make_package, executed):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        (tmp_path / 'pkg' / '__init__.py').write_text('V = (\n')
+        wrapper = Wrapper(pkg)
+        Wrapper.metrics.reset()
+        wrapper.reload()
+        assert wrapper.failed_modules == {pkg}
+        assert Wrapper.metrics.get_counter(
+            'reload_failures_total', module='pkg', exception='SyntaxError',
+        ) == 1
+        assert executed == []
+        assert pkg.V == 1
+    finally:
+        evict(pkg)
+
+
+def test_compile_sources_in_process_pool(tmp_path):
+    paths = list()
+    for name, source in (('a.py', 'V = 1\n'), ('b.py', 'V = 2\n'), ('c.py', 'V = (\n')):
+        (tmp_path / name).write_text(source)
+        paths.append(str(tmp_path / name))
+
+    compiled = compile_sources(paths, processes=1)
+    assert sorted(compiled) == paths[:2]
+    namespace = dict()
+    exec(compiled[paths[1]].code, namespace)
+    assert namespace['V'] == 2
@@ -0,0 +1,87 @@
+import pytest
+
+from module_hot_reload.coordination import GenerationChannel
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'generations')
+
+
+def test_publish_increments_generations(path):
+    channel = GenerationChannel(path, create=True, slots=4)
+    channel.reserve('a')
+    assert channel.publish('b') == 1
+    assert channel.publish('b') == 2
+    assert channel.read() == (2, {'a': 0, 'b': 2})
+    channel.close()
+
+
+def test_reader_sees_publications(path):
+    writer = GenerationChannel(path, create=True)
+    reader = GenerationChannel(path)
+    writer.publish('pkg')
+    assert reader.get_generation() == 1
+    assert reader.read() == (1, {'pkg': 1})
+    reader.close()
+    writer.close()
+
+
+def test_reopened_publisher_reuses_slots(path):
+    channel = GenerationChannel(path, create=True)
+    for _ in range(5):
+        channel.publish('pkg')
+    channel.close()
+
+    channel = GenerationChannel(path)
+    assert channel.publish('pkg') == 6
+    channel.publish('other')
+    assert channel.read() == (7, {'pkg': 6, 'other': 1})
+    channel.close()
+
+
+def test_full_channel(path):
+    channel = GenerationChannel(path, create=True, slots=1)
+    channel.publish('a')
+    with pytest.raises(RuntimeError):
+        channel.publish('b')
+    channel.close()
+
+
+def test_not_a_channel(path):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 64)
+    with pytest.raises(ValueError):
+        GenerationChannel(path)
+
+
+def test_restarted_publisher_replaces_channel(path):
+    writer = GenerationChannel(path, create=True)
+    reader = GenerationChannel(path)
+    for _ in range(3):
+        writer.publish('pkg')
+    assert reader.read() == (3, {'pkg': 3})
+    epoch = reader.epoch
+    writer.close()
+
+    writer = GenerationChannel(path, create=True)
+    assert writer.epoch != epoch
+    assert reader.get_generation() == 0
+    assert reader.epoch == writer.epoch
+    for _ in range(3):
+        writer.publish('pkg')
+    assert reader.read() == (3, {'pkg': 3})
+    reader.close()
+    writer.close()
+
+
+def test_read_of_locked_channel_times_out(path):
+    writer = GenerationChannel(path, create=True)
+    writer.publish('pkg')
+    writer._set_sequence(writer.get_sequence() + 1)  # died while publishing
+    reader = GenerationChannel(path)
+    reader.read_timeout = 0.01
+    with pytest.raises(TimeoutError):
+        reader.read()
+    reader.close()
+    writer.close()
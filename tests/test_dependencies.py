@@ -0,0 +1,106 @@
+import importlib
+
+from module_hot_reload.dependencies import DependencyGraph, get_source_imports
+from module_hot_reload.module_wrappers import (
+    DependencyGraphDoReloadMixin,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    evict,
+)
+
+
+class DependencyGraphWrapper(
+    DependencyGraphDoReloadMixin,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+):
+    pass
+
+
+def get_modules(*names):
+    return [importlib.import_module(n) for n in names]
+
+
+def get_names(modules):
+    return [m.__name__ for m in modules]
+
+
+def test_from_import_of_submodule_does_not_depend_on_package(make_package):
+    make_package('pkg', {
+        '__init__.py': 'from . import leaf, a\n',
+        'leaf.py': '',
+        'a.py': 'from . import b\n',
+        'b.py': 'from . import c\n',
+        'c.py': '',
+    })
+    graph = DependencyGraph(get_modules('pkg', 'pkg.leaf', 'pkg.a', 'pkg.b', 'pkg.c'))
+
+    assert graph.dependencies['pkg.a'] == {'pkg.b'}
+    assert graph.dependencies['pkg.b'] == {'pkg.c'}
+    assert graph.get_dependents(get_modules('pkg.leaf')) == {'pkg.leaf', 'pkg'}
+    assert graph.get_dependents(get_modules('pkg.c')) == {'pkg.c', 'pkg.b', 'pkg.a', 'pkg'}
+
+
+def test_from_import_of_object_depends_on_module(make_package):
+    make_package('pkg', {
+        '__init__.py': 'VERSION = 1\n',
+        'util.py': 'def f():\n    pass\n',
+        'user.py': 'from .util import f\nfrom pkg import VERSION\n',
+    })
+    (user,) = get_modules('pkg.user')
+
+    assert get_source_imports(user) == {'pkg.util', 'pkg'}
+    graph = DependencyGraph(get_modules('pkg', 'pkg.util', 'pkg.user'))
+    assert graph.dependencies['pkg.user'] == {'pkg', 'pkg.util'}
+
+
+def test_sort_puts_dependencies_first(make_package):
+    make_package('pkg', {
+        '__init__.py': 'from . import top\n',
+        'top.py': 'from .middle import m\n',
+        'middle.py': 'from .bottom import b\nm = b\n',
+        'bottom.py': 'b = 1\n',
+    })
+    modules = get_modules('pkg', 'pkg.top', 'pkg.middle', 'pkg.bottom')
+    graph = DependencyGraph(modules)
+
+    names = graph.get_dependents(get_modules('pkg.bottom'))
+    assert names == {'pkg.bottom', 'pkg.middle', 'pkg.top', 'pkg'}
+    assert get_names(graph.sort(names)) == ['pkg.bottom', 'pkg.middle', 'pkg.top', 'pkg']
+
+
+def test_sort_falls_back_on_cycles(make_package):
+    make_package('pkg', {
+        '__init__.py': '',
+        'a.py': 'from . import b\nx = 1\n',
+        'b.py': 'from . import a\ny = 1\n',
+        'c.py': 'from .a import x\n',
+    })
+    modules = get_modules('pkg.a', 'pkg.b', 'pkg.c')
+    graph = DependencyGraph(modules)
+
+    names = graph.get_dependents(get_modules('pkg.b'))
+    assert names == {'pkg.a', 'pkg.b', 'pkg.c'}
+    # cycle members in reversed discovery order, then their dependents
+    assert get_names(graph.sort(names)) == ['pkg.b', 'pkg.a', 'pkg.c']
+
+
+def test_outside_modules_are_ignored(make_package):
+    make_package('pkg', {'__init__.py': 'import os\nimport json.decoder\n'})
+    graph = DependencyGraph(get_modules('pkg'))
+    assert graph.dependencies['pkg'] == set()
+
+
+def test_dependency_graph_wrapper_reloads_only_dependents(tmp_path, make_package):
+    pkg = make_package('pkg', {
+        '__init__.py': 'from . import leaf, a\n',
+        'leaf.py': 'x = 1\n',
+        'a.py': 'from . import b\n',
+        'b.py': '',
+    })
+    wrapper = DependencyGraphWrapper(pkg)
+    (tmp_path / 'pkg' / 'leaf.py').write_text('x = 2\n')
+
+    assert get_names(wrapper.get_modules_to_reload()) == ['pkg.leaf', 'pkg']
+    wrapper.reload()
+    assert pkg.leaf.x == 2
+    assert get_names(wrapper.get_modules_to_reload()) == []
+    evict(pkg)
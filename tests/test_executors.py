@@ -0,0 +1,39 @@
+from threading import Event
+
+from module_hot_reload.executors import ReloadExecutor
+from module_hot_reload.metrics import Metrics
+
+
+def test_cancel_drops_pending_job():
+    executor = ReloadExecutor()
+    release = Event()
+    executed = list()
+    executor.submit('blocker', release.wait, locks=('lock',))
+    executor.submit('job', lambda: executed.append('job'), locks=('lock',))
+
+    assert executor.cancel('job')
+    assert not executor.cancel('job')
+    release.set()
+    executor.shutdown()
+
+    assert executed == []
+    assert executor.jobs_cancelled == 1
+
+
+def test_failed_job_is_counted():
+    executor = ReloadExecutor()
+    executor.metrics = Metrics()
+
+    def fail():
+        raise ValueError('reload failed')
+
+    executor.submit('job', fail)
+    executor.submit('other', lambda: None)
+    executor.shutdown()
+
+    assert executor.jobs_failed == 1
+    assert executor.jobs_executed == 2
+    assert (
+        'module_hot_reload_reload_jobs_failed_total{exception="ValueError",job="job"} 1'
+        in executor.metrics.to_prometheus()
+    )
@@ -0,0 +1,68 @@
+import os
+import resource
+from threading import Event
+
+import pytest
+
+from module_hot_reload import inotify
+
+
+pytestmark = pytest.mark.skipif(not inotify.is_available(), reason='inotify is not available')
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.events = list()
+        self.received = Event()
+
+    def dispatch(self, event):
+        self.events.append((event.event_type, os.path.basename(event.src_path)))
+        self.received.set()
+
+
+def test_observer_with_high_descriptors(tmp_path):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and hard < 1200:
+        pytest.skip('cannot open enough files')
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, 1200), hard))
+    padding = [os.open(os.devnull, os.O_RDONLY) for _ in range(1100)]
+    try:
+        observer = inotify.InotifyObserver()
+        assert observer.fileno() >= 1024
+        handler = RecordingHandler()
+        observer.schedule(handler, str(tmp_path))
+        observer.start()
+        (tmp_path / 'a.py').write_text('x = 1\n')
+        assert handler.received.wait(5)
+        assert observer.is_alive()
+        observer.stop()
+        observer.join(5)
+    finally:
+        for fd in padding:
+            os.close(fd)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_overflow_dispatches_modified_py_files(tmp_path):
+    (tmp_path / 'a.py').write_text('')
+    (tmp_path / 'notes.txt').write_text('')
+    observer = inotify.InotifyObserver()
+    handler = RecordingHandler()
+    observer.schedule(handler, str(tmp_path))
+
+    observer._dispatch([(-1, inotify.IN_Q_OVERFLOW, 0, b'')])
+
+    assert handler.events == [('modified', 'a.py')]
+    observer.close()
+
+
+def test_read_without_thread(tmp_path):
+    observer = inotify.InotifyObserver()
+    handler = RecordingHandler()
+    observer.schedule(handler, str(tmp_path))
+    observer.read()  # nothing queued, returns immediately
+    (tmp_path / 'a.py').write_text('')
+    observer.read()
+    assert ('created', 'a.py') in handler.events
+    observer.close()
+    observer.close()
@@ -0,0 +1,236 @@
+from threading import Event, Lock, RLock, Thread
+from time import monotonic, sleep
+
+import pytest
+
+from module_hot_reload.locks import SharedExclusiveLock, shared_side
+
+
+def run_in_thread(target, *args):
+    """Runs <target> in another thread, returns its result"""
+    result = list()
+    thread = Thread(target=lambda: result.append(target(*args)), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    return result[0]
+
+
+def hold_in_thread(enter, exit):
+    """Calls <enter> in another thread and keeps the lock until the returned event is set"""
+    acquired, release = Event(), Event()
+
+    def hold():
+        enter()
+        acquired.set()
+        release.wait(5)
+        exit()
+
+    thread = Thread(target=hold, daemon=True)
+    thread.start()
+    assert acquired.wait(5)
+    return release, thread
+
+
+# Reentrancy ##################################################################
+
+def test_exclusive_is_reentrant():
+    lock = SharedExclusiveLock()
+    with lock:
+        with lock:
+            assert not run_in_thread(lock.acquire_shared, False)
+        assert not run_in_thread(lock.acquire, False)
+    assert run_in_thread(lock.acquire, False)
+
+
+def test_shared_is_reentrant():
+    lock = SharedExclusiveLock()
+    with lock.shared():
+        with lock.shared():
+            assert not run_in_thread(lock.acquire, False)
+        assert not run_in_thread(lock.acquire, False)
+    assert run_in_thread(lock.acquire, False)
+
+
+def test_shared_inside_exclusive():
+    lock = SharedExclusiveLock()
+    with lock:
+        with lock.shared():
+            pass
+        with lock.shared():
+            with lock:
+                pass
+    assert run_in_thread(lock.acquire, False)
+
+
+def test_shared_is_reentrant_while_writer_waits():
+    lock = SharedExclusiveLock()
+    writer_acquired = Event()
+    with lock.shared():
+        writer = Thread(target=lambda: lock.acquire() and writer_acquired.set(), daemon=True)
+        writer.start()
+        while not lock._writers_waiting:
+            sleep(0.001)
+        with lock.shared():  # would deadlock if waiting writers blocked it
+            pass
+        assert not writer_acquired.is_set()
+    writer.join(5)
+    assert writer_acquired.is_set()
+
+
+def test_readers_share():
+    lock = SharedExclusiveLock()
+    with lock.shared():
+        assert run_in_thread(lock.acquire_shared, False)
+
+
+# Errors ######################################################################
+
+def test_upgrade_raises():
+    lock = SharedExclusiveLock()
+    with lock.shared():
+        with pytest.raises(RuntimeError):
+            lock.acquire()
+    assert lock.acquire(blocking=False)
+    lock.release()
+
+
+def test_release_unacquired_raises():
+    lock = SharedExclusiveLock()
+    with pytest.raises(RuntimeError):
+        lock.release()
+    with pytest.raises(RuntimeError):
+        lock.release_shared()
+
+
+def test_release_in_other_thread_raises():
+    lock = SharedExclusiveLock()
+    errors = list()
+
+    def release():
+        try:
+            lock.release()
+        except RuntimeError as e:
+            errors.append(e)
+
+    with lock:
+        thread = Thread(target=release)
+        thread.start()
+        thread.join(5)
+    assert len(errors) == 1
+
+
+# Writer starvation ###########################################################
+
+def test_waiting_writer_blocks_new_readers():
+    lock = SharedExclusiveLock()
+    release_reader, reader = hold_in_thread(lock.acquire_shared, lock.release_shared)
+
+    writer_acquired = Event()
+    release_writer = Event()
+
+    def write():
+        with lock:
+            writer_acquired.set()
+            release_writer.wait(5)
+
+    writer = Thread(target=write, daemon=True)
+    writer.start()
+    while not lock._writers_waiting:
+        sleep(0.001)
+
+    assert not run_in_thread(lock.acquire_shared, False)
+    assert not run_in_thread(lock.acquire_shared, True, 0.05)
+
+    release_reader.set()
+    assert writer_acquired.wait(5)
+    release_writer.set()
+    writer.join(5)
+    reader.join(5)
+    assert run_in_thread(lock.acquire_shared, False)
+
+
+def test_writer_is_not_starved_by_overlapping_readers():
+    lock = SharedExclusiveLock()
+    stop = Event()
+
+    def read():
+        while not stop.is_set():
+            with lock.shared():
+                sleep(0.001)
+
+    readers = [Thread(target=read, daemon=True) for _ in range(4)]
+    for r in readers:
+        r.start()
+    try:
+        start = monotonic()
+        assert lock.acquire(timeout=5)
+        assert monotonic() - start < 5
+        lock.release()
+    finally:
+        stop.set()
+        for r in readers:
+            r.join(5)
+
+
+# Timeouts ####################################################################
+
+def test_acquire_times_out_on_reader():
+    lock = SharedExclusiveLock()
+    release, thread = hold_in_thread(lock.acquire_shared, lock.release_shared)
+    start = monotonic()
+    assert not lock.acquire(timeout=0.05)
+    assert monotonic() - start >= 0.05
+    assert not lock.acquire(blocking=False)
+    assert not lock._writers_waiting
+    release.set()
+    thread.join(5)
+    assert lock.acquire(timeout=5)
+    lock.release()
+
+
+def test_acquire_shared_times_out_on_writer():
+    lock = SharedExclusiveLock()
+    release, thread = hold_in_thread(lock.acquire, lock.release)
+    start = monotonic()
+    assert not lock.acquire_shared(timeout=0.05)
+    assert monotonic() - start >= 0.05
+    assert not lock.acquire_shared(blocking=False)
+    assert not lock._readers
+    release.set()
+    thread.join(5)
+    assert lock.acquire_shared(timeout=5)
+    lock.release_shared()
+
+
+def test_timed_out_writer_lets_readers_in():
+    lock = SharedExclusiveLock()
+    release, thread = hold_in_thread(lock.acquire_shared, lock.release_shared)
+
+    reader_acquired = Event()
+    writer = Thread(target=lock.acquire, kwargs={'timeout': 0.1}, daemon=True)
+    writer.start()
+    while not lock._writers_waiting:
+        sleep(0.001)
+
+    def read():
+        if lock.acquire_shared(timeout=5):
+            reader_acquired.set()
+            lock.release_shared()
+
+    reader = Thread(target=read, daemon=True)
+    reader.start()  # blocked by the waiting writer until it gives up
+    assert reader_acquired.wait(5)
+    writer.join(5)
+    reader.join(5)
+    release.set()
+    thread.join(5)
+
+
+# shared_side #################################################################
+
+def test_shared_side():
+    lock = SharedExclusiveLock()
+    assert shared_side(lock) is lock.shared()
+    for other in (Lock(), RLock()):
+        assert shared_side(other) is other
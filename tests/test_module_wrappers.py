@@ -0,0 +1,264 @@
+import importlib
+
+import pytest
+
+from module_hot_reload import module_wrappers
+from module_hot_reload.discovery_cache import DiscoveryCache
+from module_hot_reload.metrics import Metrics
+from module_hot_reload.module_wrappers import (
+    CachedDiscoveryMixin,
+    FingerprintGatedDoReloadMixin,
+    ImportHookNewModuleAwarenessMixin,
+    NewModuleAwareDirModulesRecursiveStandardModuleWrapper,
+    NewModuleUnawareAllModulesRecursiveStandardModuleWrapper,
+    ModuleWrapperBase,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    ReloadBatch,
+    SnapshotModuleAttributeAccessor,
+    evict,
+)
+
+
+class ImportHookWrapper(
+    ImportHookNewModuleAwarenessMixin,
+    NewModuleUnawareAllModulesRecursiveStandardModuleWrapper,
+):
+    pass
+
+
+def get_names(wrapper):
+    return sorted(m.__name__ for m in wrapper.get_included_modules())
+
+
+# ImportHookNewModuleAwarenessMixin ###########################################
+
+def test_import_hook_single_file_module_excludes_siblings(tmp_path, make_package):
+    make_package('sibling', {'__init__.py': 'from . import sub\n', 'sub.py': ''})
+    (tmp_path / 'single.py').write_text('x = 1\n')
+    single = importlib.import_module('single')
+    try:
+        wrapper = ImportHookWrapper(single)
+        assert get_names(wrapper) == ['single']
+        assert wrapper.get_included_directory() is None
+    finally:
+        evict(single)
+        del importlib.sys.modules['single']
+
+
+def test_import_hook_single_file_module_includes_attributes(tmp_path, make_package):
+    make_package('sibling', {'__init__.py': ''})
+    (tmp_path / 'single.py').write_text('import sibling\n')
+    single = importlib.import_module('single')
+    try:
+        wrapper = ImportHookWrapper(single)
+        assert get_names(wrapper) == ['sibling', 'single']
+    finally:
+        evict(single)
+        del importlib.sys.modules['single']
+
+
+def test_import_hook_package_tracks_new_imports(make_package):
+    pkg = make_package('pkg', {'__init__.py': '', 'late.py': ''})
+    try:
+        wrapper = ImportHookWrapper(pkg)
+        assert get_names(wrapper) == ['pkg']
+        importlib.import_module('pkg.late')
+        assert get_names(wrapper) == ['pkg', 'pkg.late']
+    finally:
+        evict(pkg)
+
+
+# NewModuleAwarenessMixin #####################################################
+
+def test_new_module_awareness_walks_once_per_reload(tmp_path, make_package, monkeypatch):
+    pkg = make_package('pkg', {'__init__.py': 'from . import a\n', 'a.py': '', 'b.py': ''})
+    try:
+        wrapper = NewModuleAwareDirModulesRecursiveStandardModuleWrapper(pkg)
+        walks = list()
+        walk = module_wrappers.recursive_locked_module_iterator
+
+        def counting_walk(module, _visited=None):
+            if _visited is None:
+                walks.append(module)
+            return walk(module, _visited)
+
+        monkeypatch.setattr(module_wrappers, 'recursive_locked_module_iterator', counting_walk)
+
+        (tmp_path / 'pkg' / '__init__.py').write_text('from . import a, b\n')
+        wrapper.reload()
+        assert get_names(wrapper) == ['pkg', 'pkg.a', 'pkg.b']
+        assert get_names(wrapper) == ['pkg', 'pkg.a', 'pkg.b']
+        assert walks == [pkg]
+    finally:
+        evict(pkg)
+
+
+# CachedDiscoveryMixin ########################################################
+
+@pytest.fixture
+def cached_wrapper_class(tmp_path):
+    class Wrapper(
+        CachedDiscoveryMixin,
+        NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    ):
+        discovery_cache = DiscoveryCache(str(tmp_path / 'cache'))
+        metrics = Metrics()
+
+    return Wrapper
+
+
+def test_discovery_cache_hit(make_package, cached_wrapper_class, monkeypatch):
+    pkg = make_package('pkg', {'__init__.py': 'from . import a\n', 'a.py': ''})
+    assert get_names(cached_wrapper_class(pkg)) == ['pkg', 'pkg.a']
+    evict(pkg)
+
+    def walk(module):
+        raise AssertionError('modules walked despite a cache hit')
+
+    monkeypatch.setattr(module_wrappers, 'recursive_locked_module_iterator', walk)
+    wrapper = cached_wrapper_class(pkg)
+    assert get_names(wrapper) == ['pkg', 'pkg.a']
+    assert wrapper.metrics.get_counter('discovery_cache_hits_total', module='pkg') == 1
+    assert wrapper.metrics.get_counter('discovery_cache_misses_total', module='pkg') == 1
+    evict(pkg)
+
+
+def test_discovery_cache_rejects_entry_missing_loaded_modules(
+    make_package, cached_wrapper_class,
+):
+    pkg = make_package('pkg', {'__init__.py': '', 'extra.py': ''})
+    assert get_names(cached_wrapper_class(pkg)) == ['pkg']
+    evict(pkg)
+
+    # e.g. imported depending on configuration in another process
+    importlib.import_module('pkg.extra')
+    assert get_names(cached_wrapper_class(pkg)) == ['pkg', 'pkg.extra']
+    evict(pkg)
+
+
+# SnapshotModuleAttributeAccessor #############################################
+
+def test_snapshot_published_on_reload(tmp_path, make_package):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        accessor = SnapshotModuleAttributeAccessor(pkg)
+        (tmp_path / 'pkg' / '__init__.py').write_text('V = 2  # changed\n')
+        NewModuleUnawareDirModulesRecursiveStandardModuleWrapper(pkg).reload()
+        assert accessor.V == 2
+    finally:
+        evict(pkg)
+
+
+def test_snapshot_kept_when_reload_raises(tmp_path, make_package):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        accessor = SnapshotModuleAttributeAccessor(pkg)
+        (tmp_path / 'pkg' / '__init__.py').write_text('V = 2\nraise RuntimeError\n')
+        wrapper = NewModuleUnawareDirModulesRecursiveStandardModuleWrapper(pkg)
+        wrapper.reload()
+        assert wrapper.failed_modules == {pkg}
+        assert pkg.V == 2
+        assert accessor.V == 1
+    finally:
+        evict(pkg)
+
+
+def test_snapshot_published_on_set(make_package):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        accessor = SnapshotModuleAttributeAccessor(pkg)
+        accessor.V = 2
+        assert accessor.V == 2
+        assert pkg.V == 2
+    finally:
+        evict(pkg)
+
+
+def test_snapshot_falls_back_to_module_for_unknown_names(make_package):
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    try:
+        accessor = SnapshotModuleAttributeAccessor(pkg)
+        pkg.W = 2  # set directly, not published yet
+        assert accessor.W == 2
+        with pytest.raises(AttributeError):
+            accessor.missing
+    finally:
+        evict(pkg)
+
+
+# ReloadBatch #################################################################
+
+def test_batch_reloads_shared_modules_once_in_dependency_order(make_package):
+    reloaded, initiators = list(), list()
+
+    class Wrapper(NewModuleUnawareDirModulesRecursiveStandardModuleWrapper):
+        def reload_module(self, module):
+            reloaded.append(module.__name__)
+            super().reload_module(module)
+
+        def after_reload_included(self, initiator):
+            initiators.append(initiator)
+
+    pkg = make_package('pkg', {
+        '__init__.py': 'from . import inner\n',
+        'inner/__init__.py': 'from . import core\n',
+        'inner/core.py': 'V = 1\n',
+    })
+    try:
+        wrappers = [Wrapper(pkg), Wrapper(pkg.inner)]
+        ReloadBatch(wrappers).reload()
+        assert reloaded == ['pkg.inner.core', 'pkg.inner', 'pkg']
+        assert len(initiators) == 2
+        assert all(isinstance(i, ModuleWrapperBase) for i in initiators)
+    finally:
+        evict(pkg)
+        evict(pkg.inner)
+
+
+# FingerprintGatedDoReloadMixin ###############################################
+
+class FingerprintGatedWrapper(
+    FingerprintGatedDoReloadMixin,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+):
+    def __init__(self, module):
+        self.reloaded = list()
+        super().__init__(module)
+
+    def reload_module(self, module):
+        self.reloaded.append(module.__name__)
+        super().reload_module(module)
+
+
+@pytest.fixture
+def gated(tmp_path, make_package):
+    pkg = make_package('pkg', {
+        '__init__.py': 'from . import other, sub\n',
+        'other.py': '',
+        'sub/__init__.py': 'from . import leaf\n',
+        'sub/leaf.py': 'V = 1\n',
+    })
+    yield FingerprintGatedWrapper(pkg), tmp_path / 'pkg' / 'sub' / 'leaf.py'
+    evict(pkg)
+
+
+def test_touch_does_not_reload(gated):
+    wrapper, leaf = gated
+    leaf.touch()
+    wrapper.reload()
+    assert wrapper.reloaded == []
+
+
+def test_identical_rewrite_does_not_reload(gated):
+    wrapper, leaf = gated
+    leaf.write_text(leaf.read_text())
+    wrapper.reload()
+    assert wrapper.reloaded == []
+
+
+def test_content_change_reloads_module_and_packages(gated):
+    wrapper, leaf = gated
+    leaf.write_text('V = 2  # changed\n')
+    wrapper.reload()
+    assert wrapper.reloaded == ['pkg.sub.leaf', 'pkg.sub', 'pkg']
+    assert wrapper.module.sub.leaf.V == 2
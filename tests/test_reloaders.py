@@ -0,0 +1,185 @@
+import threading
+from threading import Event
+from time import sleep
+
+from module_hot_reload.coordination import GenerationChannel
+from module_hot_reload.module_wrappers import (
+    FingerprintGatedDoReloadMixin,
+    LazyReloadMixin,
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+)
+from module_hot_reload.reloaders import (
+    FollowerReloaderMixin,
+    LazyAutomaticReloaderMixin,
+    ManualReloaderBase,
+    NewModuleUnawareDirModulesRecursiveAutomaticReloader,
+)
+from module_hot_reload.watch_manager import WatchManager
+
+from conftest import FakeObserver
+
+
+class Reloader(NewModuleUnawareDirModulesRecursiveAutomaticReloader):
+    coalescing_window = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.watch_manager = WatchManager(FakeObserver)
+        super().__init__(*args, **kwargs)
+
+
+def test_unregister_cancels_queued_reload(make_package):
+    pkg = make_package('pkg', {'__init__.py': 'from . import a\n', 'a.py': 'x = 1\n'})
+    reloader = Reloader()
+    reloader.register(pkg)
+    locks = reloader.module_wrapper_class(pkg).get_included_locks()
+
+    release = Event()
+    reloader.executor.submit('blocker', release.wait, locks)
+    reloader.on_event(pkg)  # queued behind the blocker
+    reloader.unregister(pkg)
+    release.set()
+    reloader.executor.shutdown()
+
+    assert reloader.executor.jobs_cancelled == 1
+    assert reloader.module_owners == {}
+    assert reloader.owned_modules == {}
+    assert reloader.can_register(pkg)
+
+
+def test_reload_of_unregistered_module_does_nothing(make_package):
+    pkg = make_package('pkg', {'__init__.py': 'x = 1\n'})
+    reloader = Reloader(reload_workers=0)
+    reloader.register(pkg)
+    reloader.unregister(pkg)
+
+    reloader.reload_registered(pkg)
+
+    assert reloader.module_owners == {}
+    assert reloader.can_register(pkg)
+
+
+def test_stop_twice_keeps_shared_observer(make_package):
+    watch_manager = WatchManager(FakeObserver)
+    first, second = Reloader(), Reloader()
+    first.watch_manager = second.watch_manager = watch_manager
+    first.register(make_package('pkg', {'__init__.py': 'x = 1\n'}))
+    first.start()
+    second.start()
+    observer = watch_manager._observer
+
+    first.stop()
+    first.stop()
+    assert observer.is_alive()
+    assert watch_manager._starts == 1
+
+    second.stop()
+    assert not observer.is_alive()
+    watch_manager.stop()
+    assert watch_manager._starts == 0
+
+
+def test_unregister_keeps_wrappers_registered_elsewhere(tmp_path, make_package):
+    class Wrapper(
+        FingerprintGatedDoReloadMixin,
+        NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    ):
+        pass
+
+    class ManualReloader(ManualReloaderBase):
+        module_wrapper_class = Wrapper
+
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    first, second = ManualReloader(), ManualReloader()
+    first.register(pkg)
+    second.register(pkg)
+    wrapper = Wrapper(pkg)
+
+    (tmp_path / 'pkg' / '__init__.py').write_text('V = 2  # changed\n')
+    second.unregister(pkg)
+    assert Wrapper(pkg) is wrapper
+    first.reload()
+    assert pkg.V == 2
+
+    first.unregister(pkg)
+    assert Wrapper(pkg) is not wrapper
+
+
+def test_event_shortly_before_stop_is_dropped(make_package, monkeypatch):
+    errors = list()
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+    pkg = make_package('pkg', {'__init__.py': 'x = 1\n'})
+    reloader = Reloader(coalescing_window=0.05)
+    reloader.register(pkg)
+    reloader.start()
+
+    reloader.on_event(pkg)
+    reloader.stop()
+    sleep(0.15)
+    reloader.schedule_reload(pkg)  # a timer that passed its cancellation check
+
+    assert errors == []
+    assert reloader.executor.jobs_submitted == 0
+
+
+def test_late_schedule_after_unregister_does_not_wrap_again(make_package):
+    pkg = make_package('pkg', {'__init__.py': 'x = 1\n'})
+    reloader = Reloader()
+    reloader.register(pkg)
+    wrapper = reloader.module_wrapper_class(pkg)
+    reloader.unregister(pkg)
+
+    reloader.schedule_reload(pkg)
+
+    classes = type(wrapper)._modules_classes_instances.get(pkg, {})
+    assert type(wrapper) not in classes
+
+
+def test_follower_reloads_after_coordinator_restart(tmp_path, make_package):
+    class Follower(FollowerReloaderMixin, ManualReloaderBase):
+        module_wrapper_class = NewModuleUnawareDirModulesRecursiveStandardModuleWrapper
+
+    path = str(tmp_path / 'generations')
+    publisher = GenerationChannel(path, create=True)
+    pkg = make_package('pkg', {'__init__.py': 'x = 1\n'})
+    follower = Follower(GenerationChannel(path))
+    follower.register(pkg)
+    for _ in range(3):
+        publisher.publish('pkg')
+    assert follower.poll() == [pkg]
+    publisher.close()
+
+    publisher = GenerationChannel(path, create=True)
+    for _ in range(3):
+        publisher.publish('pkg')
+    assert follower.poll() == [pkg]
+    assert follower.poll() == []
+    follower.unregister(pkg)
+    publisher.close()
+
+
+def test_lazy_reloader_reloads_once_on_first_access(tmp_path, make_package):
+    class LazyWrapper(LazyReloadMixin, NewModuleUnawareDirModulesRecursiveStandardModuleWrapper):
+        reloads = 0
+
+        def do_reload(self):
+            LazyWrapper.reloads += 1
+            super().do_reload()
+
+    class LazyReloader(LazyAutomaticReloaderMixin, Reloader):
+        module_wrapper_class = LazyWrapper
+
+    pkg = make_package('pkg', {'__init__.py': 'V = 1\n'})
+    reloader = LazyReloader(reload_workers=0)
+    accessor = reloader.register(pkg)
+
+    (tmp_path / 'pkg' / '__init__.py').write_text('V = 2  # changed\n')
+    reloader.on_event(pkg)
+    reloader.on_event(pkg)
+    assert LazyWrapper(pkg).stale
+    assert LazyWrapper.reloads == 0
+    assert pkg.V == 1
+
+    assert accessor.V == 2
+    assert accessor.V == 2
+    assert LazyWrapper.reloads == 1
+    reloader.unregister(pkg)
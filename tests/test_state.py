@@ -0,0 +1,70 @@
+import pytest
+
+from module_hot_reload.module_wrappers import (
+    NewModuleUnawareDirModulesRecursiveStandardModuleWrapper,
+    StatePreservingDoReloadMixin,
+    evict,
+)
+
+
+class Wrapper(StatePreservingDoReloadMixin, NewModuleUnawareDirModulesRecursiveStandardModuleWrapper):
+    pass
+
+
+SOURCE = '''\
+import pathlib
+
+__reload_keep__ = ('MODEL',)
+CONFIG = pathlib.Path(__file__).with_name('config.txt')
+
+if 'MODEL' not in globals():
+    MODEL = [CONFIG.read_text()]
+
+
+def __reload_key__():
+    return CONFIG.read_text()
+
+
+def __reload_save__():
+    return len(MODEL)
+
+
+def __reload_restore__(saved):
+    global RESTORED
+    RESTORED = saved
+'''
+
+
+@pytest.fixture
+def pkg(tmp_path, make_package):
+    (tmp_path / 'pkg').mkdir()
+    (tmp_path / 'pkg' / 'config.txt').write_text('a')
+    pkg = make_package('pkg', {'__init__.py': SOURCE})
+    Wrapper(pkg)  # records the state key
+    yield pkg
+    evict(pkg)
+
+
+def reload(pkg, tmp_path):
+    (tmp_path / 'pkg' / '__init__.py').write_text(SOURCE + '\n# changed\n')
+    Wrapper(pkg).reload()
+
+
+def test_kept_globals_survive_reload(pkg, tmp_path):
+    model = pkg.MODEL
+    reload(pkg, tmp_path)
+    assert pkg.MODEL is model
+
+
+def test_changed_key_drops_kept_globals(pkg, tmp_path):
+    model = pkg.MODEL
+    (tmp_path / 'pkg' / 'config.txt').write_text('b')
+    reload(pkg, tmp_path)
+    assert pkg.MODEL is not model
+    assert pkg.MODEL == ['b']
+
+
+def test_save_and_restore_hooks_are_called(pkg, tmp_path):
+    pkg.MODEL.append('extra')
+    reload(pkg, tmp_path)
+    assert pkg.RESTORED == 2
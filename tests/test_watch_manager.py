@@ -0,0 +1,36 @@
+from module_hot_reload.watch_manager import WatchManager
+
+from conftest import FakeObserver
+
+
+class OtherObserver(FakeObserver):
+    pass
+
+
+def test_observer_exists_only_while_started(tmp_path):
+    watch_manager = WatchManager(FakeObserver)
+    watch_manager.subscribe(object(), str(tmp_path), recursive=True)
+    assert watch_manager._observer is None
+
+    watch_manager.start()
+    observer = watch_manager._observer
+    assert observer.is_alive()
+    assert observer.scheduled == [(watch_manager._routing_handler, str(tmp_path), True)]
+
+    watch_manager.stop()
+    assert not observer.is_alive()
+    assert watch_manager._observer is None
+    assert watch_manager.watch_count == 0
+
+
+def test_observer_class_changed_while_stopped(tmp_path):
+    watch_manager = WatchManager(FakeObserver)
+    watch_manager.subscribe(object(), str(tmp_path))
+    watch_manager.start()
+    watch_manager.stop()
+
+    watch_manager.observer_class = OtherObserver
+    watch_manager.start()
+    assert type(watch_manager._observer) is OtherObserver
+    assert watch_manager.watch_count == 1
+    watch_manager.stop()